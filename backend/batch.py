@@ -0,0 +1,212 @@
+# backend/batch.py
+"""
+Batch quiz generation for reading lists: concurrent scraping, several articles per
+LLM call, one bulk insert. Used by POST /generate_quiz/batch and by the CLI:
+
+    python -m backend.batch --file urls.txt [--output results.json]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from .database import Quiz, QuizPayload, create_tables
+from .blobs import add_quizzes, load_payload
+from .llm_quiz_generator import pack_batches, PROMPT_VERSION
+from .cache import quiz_cache, canonical_url, remember_redirect, content_hash
+from .pipeline import scrape_article, generate_batch, run_db, quiz_response, ScrapeError
+from .metrics import timed
+
+BATCH_MAX_URLS = int(os.getenv("QUIZ_BATCH_MAX_URLS", "500"))
+BATCH_SCRAPE_CONCURRENCY = int(os.getenv("QUIZ_BATCH_SCRAPE_CONCURRENCY", "8"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("QUIZ_BATCH_LLM_CONCURRENCY", "2"))
+
+# ---------- DB steps ---------- #
+def _cached_by_hash(db, hashes: list[str]) -> dict:
+    """Newest stored quiz (with its payload blob) per content hash for the current prompt version."""
+    if not hashes:
+        return {}
+    rows = db.execute(
+        select(Quiz, QuizPayload.data_z)
+        .join(QuizPayload, QuizPayload.quiz_id == Quiz.id)
+        .where(Quiz.content_hash.in_(hashes), Quiz.prompt_version == PROMPT_VERSION)
+        .order_by(Quiz.id)
+    ).all()
+    return {q.content_hash: (q, blob) for q, blob in rows}
+
+def _save_quizzes(db, entries: list[tuple[dict, str, dict]]) -> list[Quiz]:
+    # one transaction; date set here so rows need no refresh after commit
+    now = datetime.now(timezone.utc)
+    quizzes = add_quizzes(db, [({"date_generated": now, **fields}, text, quiz_json)
+                               for fields, text, quiz_json in entries])
+    db.commit()
+    return quizzes
+
+async def _noop_progress(event: dict):
+    pass
+
+async def run_batch(
+    urls: list[str],
+    scrape_concurrency: int = BATCH_SCRAPE_CONCURRENCY,
+    llm_concurrency: int = BATCH_LLM_CONCURRENCY,
+    on_progress=None,
+) -> dict:
+    """
+    Generate quizzes for many URLs. Per-item failures are reported in the item and
+    never fail the batch. on_progress: optional async callback receiving event dicts.
+    Returns {"items": [...], "stats": {...}} with items in input order.
+    """
+    progress = on_progress or _noop_progress
+    start = time.perf_counter()
+    total = len(urls)
+    items = [{"url": u, "status": "pending", "quiz_id": None, "cached": False, "error": None} for u in urls]
+
+    # 1) scrape with bounded fan-out
+    scrape_sem = asyncio.Semaphore(max(1, scrape_concurrency))
+    scraped = 0
+
+    async def scrape_one(i: int):
+        nonlocal scraped
+        async with scrape_sem:
+            try:
+                return await scrape_article(urls[i])
+            except ScrapeError as e:
+                items[i].update(status="error", error=f"Scraping failed: {e}")
+                return None
+            finally:
+                scraped += 1
+                await progress({"stage": "scraping", "done": scraped, "total": total, "url": urls[i]})
+
+    articles = await asyncio.gather(*(scrape_one(i) for i in range(total)))
+
+    # 2) reuse stored quizzes for identical text; generate each distinct text once
+    by_hash: dict = {}
+    for i, article in enumerate(articles):
+        if article is not None:
+            by_hash.setdefault(content_hash(article.text), []).append(i)
+    with timed("cache_lookup"):
+        cached = await run_db(_cached_by_hash, list(by_hash))
+
+    def finish(i: int, q: Quiz, quiz_json: dict, was_cached: bool):
+        items[i].update(status="ok", quiz_id=q.id, cached=was_cached)
+        key = canonical_url(urls[i])
+        resolved = canonical_url(articles[i].url)
+        remember_redirect(key, resolved)
+        quiz_cache.set((resolved, PROMPT_VERSION), quiz_response(q, quiz_json))
+
+    for h, (q, blob) in cached.items():
+        try:
+            quiz_json = load_payload(blob)
+        except ValueError:
+            continue
+        for i in by_hash.pop(h):
+            finish(i, q, quiz_json, True)
+
+    # 3) pack remaining articles into as few LLM calls as the token budget allows
+    todo = list(by_hash)
+    texts = [articles[by_hash[h][0]].text for h in todo]
+    groups = pack_batches(texts)
+    llm_sem = asyncio.Semaphore(max(1, llm_concurrency))
+    generated: dict = {}
+    tokens = llm_calls = fallbacks = 0
+    done_groups = 0
+
+    async def generate_group(group: list[int]):
+        nonlocal tokens, llm_calls, fallbacks, done_groups
+        async with llm_sem:
+            with timed("generate"):
+                result = await generate_batch([texts[g] for g in group])
+        tokens += result.tokens
+        llm_calls += result.llm_calls
+        fallbacks += result.fallbacks
+        for g, quiz in zip(group, result.quizzes):
+            if isinstance(quiz, Exception):
+                for i in by_hash[todo[g]]:
+                    items[i].update(status="error", error=f"LLM generation failed: {quiz}")
+            else:
+                generated[todo[g]] = quiz
+        done_groups += 1
+        await progress({"stage": "generating", "done": done_groups, "total": len(groups)})
+
+    await asyncio.gather(*(generate_group(g) for g in groups))
+
+    # 4) bulk insert in one transaction
+    if generated:
+        await progress({"stage": "saving", "count": len(generated)})
+        order = list(generated)
+        rows = []
+        for h in order:
+            first = articles[by_hash[h][0]]
+            quiz_json = generated[h]
+            rows.append(({
+                "url": urls[by_hash[h][0]],
+                "canonical_url": canonical_url(first.url),
+                "title": first.title or quiz_json.get("title"),
+                "content_hash": h,
+                "prompt_version": PROMPT_VERSION,
+            }, first.text, quiz_json))
+        with timed("persist"):
+            saved = await run_db(_save_quizzes, rows)
+        for h, q in zip(order, saved):
+            for i in by_hash[h]:
+                finish(i, q, generated[h], False)
+
+    elapsed = time.perf_counter() - start
+    ok = sum(1 for it in items if it["status"] == "ok")
+    stats = {
+        "articles": total,
+        "succeeded": ok,
+        "cached": sum(1 for it in items if it["cached"]),
+        "failed": total - ok,
+        "llm_calls": llm_calls,
+        "fallback_calls": fallbacks,
+        "tokens": tokens,
+        "tokens_per_quiz": round(tokens / len(generated), 1) if generated else 0.0,
+        "elapsed_s": round(elapsed, 3),
+        "articles_per_minute": round(ok / elapsed * 60, 1) if elapsed > 0 else 0.0,
+    }
+    await progress({"stage": "done", **stats})
+    return {"items": items, "stats": stats}
+
+# ---------- CLI ---------- #
+def _read_urls(args) -> list[str]:
+    urls = list(args.urls)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            urls += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return urls
+
+async def _print_progress(event: dict):
+    print(json.dumps(event), file=sys.stderr)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-generate quizzes for a list of article URLs.")
+    parser.add_argument("urls", nargs="*")
+    parser.add_argument("--file", help="text file with one URL per line")
+    parser.add_argument("--scrape-concurrency", type=int, default=BATCH_SCRAPE_CONCURRENCY)
+    parser.add_argument("--llm-concurrency", type=int, default=BATCH_LLM_CONCURRENCY)
+    parser.add_argument("--output", help="write the full result JSON here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    urls = _read_urls(args)
+    if not urls:
+        parser.error("no URLs given")
+
+    create_tables()
+    result = asyncio.run(run_batch(urls, args.scrape_concurrency, args.llm_concurrency, _print_progress))
+
+    out = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(out)
+    else:
+        print(out)
+    return 0 if result["stats"]["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# backend/blobs.py
+"""
+Compressed storage for the large per-quiz payloads.
+
+Article text lives in `articles`, one row per content hash, so regenerating a quiz
+for the same text does not store it again. The quiz JSON lives in `quiz_payloads`,
+one row per quiz, serialized once at save time in the exact form /quiz/{id} returns
+it, so the request path only decompresses and splices bytes.
+
+Blobs carry a one-byte codec tag: b"z" zlib, b"s" zstd (used when the `zstandard`
+package is installed, or forced with QUIZ_BLOB_CODEC=zlib|zstd).
+"""
+import os
+import json
+import zlib
+
+from pydantic import TypeAdapter
+from sqlalchemy import select, insert
+
+from .database import Article, Quiz, QuizPayload
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is always available
+    zstandard = None
+
+ZLIB_LEVEL = int(os.getenv("QUIZ_BLOB_ZLIB_LEVEL", "6"))
+ZSTD_LEVEL = int(os.getenv("QUIZ_BLOB_ZSTD_LEVEL", "9"))
+BLOB_CODEC = os.getenv("QUIZ_BLOB_CODEC", "zstd" if zstandard is not None else "zlib")
+
+if BLOB_CODEC == "zstd" and zstandard is None:
+    raise RuntimeError("QUIZ_BLOB_CODEC=zstd requires the zstandard package")
+if BLOB_CODEC not in ("zlib", "zstd"):
+    raise RuntimeError(f"Unknown QUIZ_BLOB_CODEC {BLOB_CODEC!r} (expected zlib or zstd)")
+
+
+def compress(data: bytes) -> bytes:
+    if BLOB_CODEC == "zstd":
+        return b"s" + zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return b"z" + zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress(blob: bytes) -> bytes:
+    tag, body = blob[:1], blob[1:]
+    if tag == b"z":
+        try:
+            return zlib.decompress(body)
+        except zlib.error as e:
+            raise ValueError(f"corrupt zlib blob: {e}") from e
+    if tag == b"s":
+        if zstandard is None:
+            raise RuntimeError("blob is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(body)
+    raise ValueError(f"unknown blob codec tag {tag!r}")
+
+# ---------- quiz payloads ---------- #
+def payload_json(quiz_json: dict) -> bytes:
+    """The stored part of a quiz response: {"summary": ..., "questions": [...]}."""
+    payload = {"summary": quiz_json.get("summary"), "questions": quiz_json.get("questions", [])}
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+# the row's columns go through pydantic like every other response, so dates are
+# formatted the same way ("Z" for UTC) as in /history and /generate_quiz
+_head_json = TypeAdapter(dict)
+
+
+def load_payload(blob: bytes) -> dict:
+    return json.loads(decompress(blob))
+
+
+def response_bytes(q, blob: bytes) -> bytes:
+    """
+    Full /quiz/{id} body (QuizOutputSchema) from the row's columns and its stored
+    payload, without parsing the payload.
+    """
+    head = _head_json.dump_json(
+        {"id": q.id, "url": q.url, "title": q.title, "date_generated": q.date_generated}
+    )
+    body = decompress(blob)
+    # body is a non-empty JSON object: splice its members after the row's
+    return head[:-1] + b"," + body[1:-1] + b',"cached":false,"cache_source":null}'
+
+# ---------- writes ---------- #
+def store_article(db, text_hash: str, text: str):
+    """
+    Add the article text for text_hash unless it is already stored (no commit).
+    Concurrent savers of the same text are fine: the insert skips an existing key.
+    """
+    raw = text.encode("utf-8")
+    row = {"content_hash": text_hash, "text_z": compress(raw), "raw_bytes": len(raw)}
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        db.execute(dialect_insert(Article).values(**row).on_conflict_do_nothing())
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        db.execute(dialect_insert(Article).values(**row).on_conflict_do_nothing())
+    elif dialect in ("mysql", "mariadb"):
+        db.execute(insert(Article).values(**row).prefix_with("IGNORE"))
+    elif db.get(Article, text_hash) is None:
+        db.add(Article(**row))
+
+
+def add_quizzes(db, entries: list[tuple[dict, str | None, dict]]) -> list[Quiz]:
+    """
+    Add Quiz rows with their compressed payloads and (deduplicated) article text.
+    entries: (quiz column values, article text or None, quiz JSON) per quiz.
+    Flushes once to get the ids; the caller commits.
+    """
+    quizzes = []
+    for fields, text, _ in entries:
+        if text is not None and fields.get("content_hash"):
+            store_article(db, fields["content_hash"], text)
+        quizzes.append(Quiz(**fields))
+    db.add_all(quizzes)
+    db.flush()
+    db.add_all(
+        QuizPayload(quiz_id=q.id, data_z=compress(payload_json(quiz_json)))
+        for q, (_, _, quiz_json) in zip(quizzes, entries)
+    )
+    return quizzes
+
+# ---------- reads ---------- #
+def quiz_with_payload(db, quiz_id: int):
+    """Row of (id, url, title, date_generated, data_z) for /quiz/{id}; the article text is never loaded."""
+    stmt = (
+        select(Quiz.id, Quiz.url, Quiz.title, Quiz.date_generated, QuizPayload.data_z)
+        .join(QuizPayload, QuizPayload.quiz_id == Quiz.id)
+        .where(Quiz.id == quiz_id)
+    )
+    return db.execute(stmt).first()
+
+
+def article_text(db, text_hash: str) -> str | None:
+    blob = db.execute(select(Article.text_z).where(Article.content_hash == text_hash)).scalar()
+    return decompress(blob).decode("utf-8") if blob is not None else None
@@ -0,0 +1,131 @@
+# backend/cache.py
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, unquote, parse_qs
+
+from sqlalchemy import select
+
+from .database import Quiz, QuizPayload
+
+# In-process tier sizing (override via .env)
+CACHE_MAX_ENTRIES = int(os.getenv("QUIZ_CACHE_MAX_ENTRIES", "512"))
+CACHE_TTL_SECONDS = float(os.getenv("QUIZ_CACHE_TTL_SECONDS", "3600"))
+
+# canonical request URL -> canonical article URL, learned from scraped pages
+_redirect_aliases = OrderedDict()
+_alias_lock = threading.Lock()
+
+
+def canonical_url(url: str) -> str:
+    """
+    Normalise a Wikipedia article URL so equivalent links share one cache key:
+    mobile domain, fragments, index.php?title=..., query params other than ?oldid
+    (a specific revision is different content), percent-encoding/spaces, first-letter
+    case and learned redirects.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    # en.m.wikipedia.org -> en.wikipedia.org
+    host = host.replace(".m.wikipedia.org", ".wikipedia.org")
+    path = unquote(parts.path).replace(" ", "_")
+    query = parse_qs(parts.query)
+
+    if path.endswith("/index.php") and query.get("title"):
+        # /w/index.php?title=Foo&oldid=123 -> /wiki/Foo
+        path = "/wiki/" + query["title"][0].replace(" ", "_")
+
+    if "wikipedia.org" in host and path.startswith("/wiki/"):
+        # MediaWiki titles are case-insensitive in the first letter only
+        title = path[len("/wiki/"):]
+        path = "/wiki/" + title[:1].upper() + title[1:]
+        oldid = query.get("oldid")
+        canonical = urlunsplit(("https", host, path, f"oldid={oldid[0]}" if oldid else "", ""))
+    else:
+        canonical = urlunsplit((parts.scheme.lower(), host, path, parts.query, ""))
+
+    return _redirect_aliases.get(canonical, canonical)
+
+
+def remember_redirect(requested: str, resolved: str):
+    """Record that `requested` (canonical form) ends up at `resolved`, e.g. /wiki/USA -> /wiki/United_States."""
+    if requested == resolved:
+        return
+    with _alias_lock:
+        _redirect_aliases[requested] = resolved
+        _redirect_aliases.move_to_end(requested)
+        while len(_redirect_aliases) > CACHE_MAX_ENTRIES * 4:
+            _redirect_aliases.popitem(last=False)
+
+
+def content_hash(text: str) -> str:
+    """Stable hash of the cleaned article text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class QuizCache:
+    """Thread-safe LRU cache with a per-entry TTL, keyed on (canonical url, prompt version)."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            "memory_hits": 0,
+            "db_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.stats["expirations"] += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return value
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def record(self, counter: str):
+        with self._lock:
+            self.stats[counter] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {**self.stats, "size": len(self._data), "max_entries": self.max_entries, "ttl_seconds": self.ttl}
+
+
+def find_cached_quiz(db, text_hash: str, prompt_version: str):
+    """
+    Persistent tier: newest quiz generated from identical text with the same prompt,
+    as a (Quiz, payload blob) row, or None.
+    """
+    return db.execute(
+        select(Quiz, QuizPayload.data_z)
+        .join(QuizPayload, QuizPayload.quiz_id == Quiz.id)
+        .where(Quiz.content_hash == text_hash, Quiz.prompt_version == prompt_version)
+        .order_by(Quiz.id.desc())
+        .limit(1)
+    ).first()
+
+
+quiz_cache = QuizCache()
@@ -7,9 +7,15 @@ from sqlalchemy import (
     String,
     DateTime,
     Text,
+    LargeBinary,
+    ForeignKey,
+    Index,
     func,
+    inspect,
+    text,
 )
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.engine import make_url
 from dotenv import load_dotenv
 
 # Load environment variables from .env
@@ -25,6 +31,55 @@ engine = create_engine(DATABASE_URL, echo=False, future=True)
 # Session factory
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True, expire_on_commit=False)
 
+# Async drivers for the async pipeline (QUIZ_ASYNC_PIPELINE=1)
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+}
+
+def _async_database_url(url: str) -> str:
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for {backend!r}; set ASYNC_DATABASE_URL")
+    return u.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Created lazily so the sync app does not need an async driver installed
+_async_engine = None
+_async_session_factory = None
+
+def get_async_sessionmaker():
+    """Return the AsyncSession factory, creating the async engine on first use."""
+    global _async_engine, _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL or _async_database_url(DATABASE_URL), echo=False)
+        _async_session_factory = async_sessionmaker(bind=_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_session_factory
+
+def pool_status() -> dict:
+    """QueuePool usage per engine ("sync", and "async" once created), for /metrics."""
+    engines = {"sync": engine}
+    if _async_engine is not None:
+        engines["async"] = _async_engine.sync_engine
+    status = {}
+    for name, eng in engines.items():
+        pool = eng.pool
+        if not hasattr(pool, "checkedout"):  # NullPool / StaticPool / SingletonThreadPool
+            continue
+        status[name] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            # negative while fewer than `size` connections have been opened
+            "overflow": max(0, pool.overflow()),
+        }
+    return status
+
 # Declarative base
 Base = declarative_base()
 
@@ -32,18 +87,101 @@ class Quiz(Base):
     __tablename__ = "quizzes"
 
     id = Column(Integer, primary_key=True, index=True)
-    url = Column(String(1024), nullable=False)
+    url = Column(String(1024), nullable=False, index=True)
+    canonical_url = Column(String(1024), nullable=True, index=True)
     title = Column(String(512), nullable=True)
     date_generated = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    scraped_content = Column(Text, nullable=True)
-    full_quiz_data = Column(Text, nullable=False)
+    # article text (articles) and quiz JSON (quiz_payloads) live in their own tables;
+    # content_hash is the cache key for reusing a stored quiz (see cache.py)
+    content_hash = Column(String(64), nullable=True, index=True)
+    prompt_version = Column(String(64), nullable=True)
+
+    __table_args__ = (
+        # keyset pagination for /history: ORDER BY date_generated DESC, id DESC
+        Index("ix_quizzes_date_generated_id", "date_generated", "id"),
+    )
 
     def __repr__(self):
         return f"<Quiz id={self.id} title={self.title!r} url={self.url!r}>"
 
-def create_tables():
-    """Create DB tables (if not present)."""
+class Article(Base):
+    """Scraped article text, compressed, stored once per distinct text (see blobs.py)."""
+    __tablename__ = "articles"
+
+    content_hash = Column(String(64), primary_key=True)
+    text_z = Column(LargeBinary, nullable=False)
+    raw_bytes = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<Article hash={self.content_hash[:12]} raw_bytes={self.raw_bytes}>"
+
+class QuizPayload(Base):
+    """Compressed quiz JSON ({"summary", "questions"}) for one quiz (see blobs.py)."""
+    __tablename__ = "quiz_payloads"
+
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), primary_key=True)
+    data_z = Column(LargeBinary, nullable=False)
+
+    def __repr__(self):
+        return f"<QuizPayload quiz_id={self.quiz_id} bytes={len(self.data_z)}>"
+
+class Job(Base):
+    """Background generation job (POST /generate_quiz?async=1)."""
+    __tablename__ = "jobs"
+
+    id = Column(String(36), primary_key=True)
+    url = Column(String(1024), nullable=False)
+    priority = Column(Integer, nullable=False, default=0)
+    status = Column(String(16), nullable=False, default="queued", index=True)  # queued/running/done/failed
+    stage = Column(String(32), nullable=True)  # scraping/generating/saving while running
+    quiz_id = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<Job id={self.id} status={self.status!r} url={self.url!r}>"
+
+# Blob columns that used to live on quizzes; moved out by backend/migrate_blobs.py
+LEGACY_QUIZ_COLUMNS = ("scraped_content", "full_quiz_data")
+
+def legacy_quiz_columns() -> list[str]:
+    """Legacy blob columns still present on an existing quizzes table."""
+    insp = inspect(engine)
+    if not insp.has_table(Quiz.__tablename__):
+        return []
+    present = {c["name"] for c in insp.get_columns(Quiz.__tablename__)}
+    return [c for c in LEGACY_QUIZ_COLUMNS if c in present]
+
+# Columns added to quizzes after the first release; create_all does not alter existing tables
+ADDED_QUIZ_COLUMNS = ("canonical_url", "content_hash", "prompt_version")
+
+def add_missing_quiz_columns() -> list[str]:
+    """ALTER an existing quizzes table to add any of ADDED_QUIZ_COLUMNS it lacks."""
+    insp = inspect(engine)
+    if not insp.has_table(Quiz.__tablename__):
+        return []
+    present = {c["name"] for c in insp.get_columns(Quiz.__tablename__)}
+    missing = [c for c in ADDED_QUIZ_COLUMNS if c not in present]
+    with engine.begin() as conn:
+        for name in missing:
+            col_type = Quiz.__table__.c[name].type.compile(dialect=engine.dialect)
+            conn.execute(text(f"ALTER TABLE {Quiz.__tablename__} ADD COLUMN {name} {col_type}"))
+    return missing
+
+def create_tables(allow_legacy: bool = False):
+    """Create DB tables (if not present) and bring an existing quizzes table up to date."""
+    add_missing_quiz_columns()
+    if not allow_legacy and legacy_quiz_columns():
+        raise RuntimeError(
+            "quizzes still has the old scraped_content/full_quiz_data columns; "
+            "run `python -m backend.migrate_blobs` once to move them to compressed storage"
+        )
     Base.metadata.create_all(bind=engine)
+    # create_all skips indexes on tables that already exist (cache lookups, /history)
+    for index in Quiz.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
 
 if __name__ == "__main__":
     create_tables()
@@ -0,0 +1,226 @@
+# backend/extractors.py
+import os
+import re
+
+from bs4 import BeautifulSoup, Tag
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional; BeautifulSoup is always available
+    etree = None
+
+# QUIZ_HTML_EXTRACTOR=auto|lxml|bs4 (auto -> lxml when installed)
+HTML_EXTRACTOR = os.getenv("QUIZ_HTML_EXTRACTOR", "auto")
+
+# paragraphs joined with blank lines; chunked generation (QUIZ_CHUNKED_GENERATION=1)
+# quizzes the whole article, so it keeps more (the chunk token budget picks what is sent)
+CHUNKED_TEXT_CHARS = 100000
+MAX_TEXT_CHARS = int(os.getenv(
+    "QUIZ_MAX_TEXT_CHARS",
+    str(CHUNKED_TEXT_CHARS if os.getenv("QUIZ_CHUNKED_GENERATION", "0") == "1" else 20000),
+))
+FALLBACK_TEXT_CHARS = 10000  # div/span text when a page has no <p>
+
+# non-paragraph content dropped from the article body
+REMOVE_TAGS = frozenset(["table", "style", "script", "noscript", "sup"])
+REMOVE_CLASSES = frozenset(["reference", "toc", "thumb", "infobox"])
+
+_WS_RE = re.compile(r"\s+")
+
+# ---------- BeautifulSoup (reference implementation, always available) ---------- #
+def _clean_paragraph(p: Tag) -> str:
+    """Return cleaned text from a <p> tag, stripping sup, reference links, and extra whitespace."""
+    # remove sup and reference anchors
+    for sup in p.find_all("sup"):
+        sup.decompose()
+    for a in p.find_all("a", class_="mw-selflink"):
+        a.unwrap()
+    text = p.get_text(separator=" ", strip=True)
+    # collapse multiple spaces/newlines
+    text = re.sub(r"\s+", " ", text)
+    return text
+
+def extract_bs4(html: str, max_paragraphs: int = None) -> tuple[str, str]:
+    """Extract (title, cleaned_text) by building a full BeautifulSoup tree."""
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Title
+    title_tag = soup.find("h1", id="firstHeading")
+    title = title_tag.get_text(strip=True) if title_tag else ""
+
+    # Main content block
+    content_div = soup.find(id="mw-content-text")
+    if not content_div:
+        # fallback: try article tag
+        content_div = soup.find("article")
+
+    if not content_div:
+        raise RuntimeError("Couldn't find main content on the page.")
+
+    # remove tables, infoboxes, navboxes, and other non-paragraph content
+    for selector in ["table", "style", "script", "noscript", "sup", ".reference", ".toc", ".thumb", ".infobox"]:
+        for node in content_div.select(selector):
+            node.decompose()
+
+    # collect paragraph texts
+    paragraphs = []
+    for p in content_div.find_all("p"):
+        cleaned = _clean_paragraph(p)
+        if cleaned:
+            paragraphs.append(cleaned)
+            if max_paragraphs and len(paragraphs) >= max_paragraphs:
+                break
+
+    # if no paragraphs found, try to collect text from divs
+    if not paragraphs:
+        texts = [t.get_text(separator=" ", strip=True) for t in content_div.find_all(["div", "span"])]
+        joined = " ".join([re.sub(r"\s+", " ", t) for t in texts if t])
+        return title, joined[:FALLBACK_TEXT_CHARS]  # limit length
+
+    full_text = "\n\n".join(paragraphs)
+    return title, full_text[:MAX_TEXT_CHARS]  # return at most MAX_TEXT_CHARS (adjustable)
+
+# ---------- lxml streaming extractor ---------- #
+LXML_CHUNK_CHARS = 16384
+
+# Tags on which libxml2 ends an open <p> (html.parser, used by extract_bs4, nests them
+# inside it instead), so "<p>a<div>b</div>c</p>" would lose "c" with lxml.
+_P_BOUNDARY_RE = re.compile(
+    r"<(/?)(p|div|table|caption|tbody|tfoot|tr|td|th|ul|ol|li|dl|dd|dt|h[1-6]|pre|blockquote|"
+    r"address|center|dir|fieldset|form|hr|menu|listing|xmp)(?=[\s/>])",
+    re.IGNORECASE,
+)
+
+def _scan_p_boundaries(html: str, pos: int, endpos: int, in_p: bool) -> tuple[bool, bool, int]:
+    """
+    Scan html[pos:endpos] for a <p> ended by another tag rather than </p>.
+    Returns (found, in_p, resume position); call again with those as more HTML arrives.
+    """
+    resume = max(pos, endpos - 16)  # a tag cut off at endpos is matched on the next call
+    for m in _P_BOUNDARY_RE.finditer(html, pos, endpos):
+        closing, tag = m.group(1), m.group(2).lower()
+        if closing:
+            in_p = False  # </p>, or an enclosing block ending, closes the <p> in both parsers
+        elif in_p:
+            return True, in_p, m.end()
+        elif tag == "p":
+            in_p = True
+        resume = max(resume, m.end())
+    return False, in_p, resume
+
+def _closes_p_implicitly(html: str, start: int = 0) -> bool:
+    """True if some <p> after `start` is ended by another tag rather than </p>."""
+    return _scan_p_boundaries(html, start, len(html), False)[0]
+
+def _is_removed(el) -> bool:
+    if el.tag in REMOVE_TAGS:
+        return True
+    classes = el.get("class")
+    return bool(classes) and not REMOVE_CLASSES.isdisjoint(classes.split())
+
+def _strings(el, skip_removed: bool):
+    """Text nodes under el in document order, like BeautifulSoup's .strings (comments excluded)."""
+    if el.text:
+        yield el.text
+    for child in el:
+        if isinstance(child.tag, str) and not (skip_removed and _is_removed(child)):
+            yield from _strings(child, skip_removed)
+        # a removed element's tail still belongs to its parent
+        if child.tail:
+            yield child.tail
+
+def _stripped_text(el, separator: str, skip_removed: bool) -> str:
+    return separator.join(s for s in (s.strip() for s in _strings(el, skip_removed)) if s)
+
+def extract_lxml(html: str, max_paragraphs: int = None) -> tuple[str, str]:
+    """
+    Extract (title, cleaned_text) with lxml's incremental HTML parser. The page is fed
+    in chunks and parsing stops as soon as max_paragraphs or MAX_TEXT_CHARS is reached;
+    finished elements are freed as we go. Pages without an #mw-content-text block,
+    without paragraphs, or with a <p> that is not closed by its own </p> (unclosed,
+    or containing a block element) are handed to extract_bs4 so the output always
+    matches it.
+    """
+    parser = etree.HTMLPullParser(events=("start", "end"))
+    title = None
+    content = None
+    content_done = False
+    removed = 0  # depth inside a removed element
+    in_p = 0
+    in_title = 0
+    paragraphs = []
+    size = 0
+    full = False
+
+    # only what is fed is checked, so an early stop does not scan the whole page
+    scan_pos, scan_in_p = max(0, html.find("mw-content-text")), False
+
+    for offset in range(0, len(html), LXML_CHUNK_CHARS):
+        implicit, scan_in_p, scan_pos = _scan_p_boundaries(html, scan_pos, offset + LXML_CHUNK_CHARS, scan_in_p)
+        if implicit:
+            return extract_bs4(html, max_paragraphs)
+        parser.feed(html[offset:offset + LXML_CHUNK_CHARS])
+        for event, el in parser.read_events():
+            tag = el.tag
+            if not isinstance(tag, str):
+                continue
+
+            if event == "start":
+                if title is None and tag == "h1" and el.get("id") == "firstHeading":
+                    in_title += 1
+                if content is None:
+                    if not content_done and el.get("id") == "mw-content-text":
+                        content = el
+                elif removed or _is_removed(el):
+                    removed += 1
+                elif tag == "p":
+                    in_p += 1
+                continue
+
+            # event == "end"
+            if in_title and tag == "h1" and el.get("id") == "firstHeading":
+                in_title -= 1
+                title = _stripped_text(el, "", skip_removed=False)
+
+            if el is content:
+                content = None
+                content_done = True
+            elif content is not None:
+                if removed:
+                    removed -= 1
+                elif tag == "p":
+                    in_p -= 1
+                    if not full:
+                        text = _WS_RE.sub(" ", _stripped_text(el, " ", skip_removed=True))
+                        if text:
+                            size += len(text) + (2 if paragraphs else 0)
+                            paragraphs.append(text)
+                            full = size >= MAX_TEXT_CHARS or bool(max_paragraphs and len(paragraphs) >= max_paragraphs)
+
+            # children are only needed until their <p>/<h1> has been read
+            if not (in_p or in_title):
+                el.clear(keep_tail=True)
+                while el.getprevious() is not None:
+                    del el.getparent()[0]
+
+        if (full or content_done) and title is not None:
+            break
+
+    if not paragraphs:
+        return extract_bs4(html, max_paragraphs)
+
+    return title or "", "\n\n".join(paragraphs)[:MAX_TEXT_CHARS]
+
+# ---------- backend selection ---------- #
+EXTRACTORS = {"bs4": extract_bs4}
+if etree is not None:
+    EXTRACTORS["lxml"] = extract_lxml
+
+def extract_article(html: str, max_paragraphs: int = None, backend: str = None) -> tuple[str, str]:
+    """Extract (title, cleaned_text) from a Wikipedia article page with the configured backend."""
+    backend = backend or HTML_EXTRACTOR
+    if backend == "auto":
+        backend = "lxml" if "lxml" in EXTRACTORS else "bs4"
+    if backend not in EXTRACTORS:
+        raise ValueError(f"Unknown or unavailable HTML extractor {backend!r}; available: {sorted(EXTRACTORS)}")
+    return EXTRACTORS[backend](html, max_paragraphs)
@@ -0,0 +1,396 @@
+# backend/fetcher.py
+import os
+import re
+import gzip
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from html import unescape
+from typing import NamedTuple
+from urllib.parse import urlsplit, urlunsplit, parse_qs, quote, unquote
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from starlette.concurrency import run_in_threadpool
+
+HEADERS = {
+    "User-Agent": "ai-quiz-generator/1.0 (https://example.com) Python requests"
+}
+
+FETCH_TIMEOUT = 15
+FETCH_POOL_SIZE = int(os.getenv("QUIZ_FETCH_POOL_SIZE", "32"))
+FETCH_RETRIES = int(os.getenv("QUIZ_FETCH_RETRIES", "3"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# On-disk HTML cache (user cache dir by default); set QUIZ_HTML_CACHE_DIR= (empty) to disable
+_USER_CACHE = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+HTML_CACHE_DIR = os.getenv("QUIZ_HTML_CACHE_DIR", os.path.join(_USER_CACHE, "ai-quiz-generator", "html"))
+# Entries younger than this are used without revalidating
+HTML_CACHE_MAX_AGE = float(os.getenv("QUIZ_HTML_CACHE_MAX_AGE", "300"))
+# Disk bounds: entries not fetched/revalidated for this long are deleted, and the oldest
+# go first once the cache is over its size budget (checked every PRUNE_INTERVAL seconds)
+HTML_CACHE_MAX_BYTES = int(os.getenv("QUIZ_HTML_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+HTML_CACHE_EXPIRE_AFTER = float(os.getenv("QUIZ_HTML_CACHE_EXPIRE_AFTER", str(7 * 24 * 3600)))
+HTML_CACHE_PRUNE_INTERVAL = float(os.getenv("QUIZ_HTML_CACHE_PRUNE_INTERVAL", "600"))
+
+# Hosts whose /wiki/ pages are fetched through the REST page/html endpoint (content only, no skin)
+API_HOST_RE = re.compile(os.getenv("QUIZ_FETCH_API_HOSTS", r"(^|\.)wikipedia\.org$"))
+USE_PARSE_API = os.getenv("QUIZ_FETCH_USE_API", "1") == "1"
+
+
+class FetchResult(NamedTuple):
+    html: str
+    url: str  # final URL of the article (after redirects)
+
+
+class CacheEntry(NamedTuple):
+    body: str
+    final_url: str
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+
+    def is_fresh(self) -> bool:
+        return time.time() - self.fetched_at < HTML_CACHE_MAX_AGE
+
+    def validators(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HtmlDiskCache:
+    """
+    Response bodies (gzip) plus ETag/Last-Modified metadata, one pair of files per URL.
+    Kept under max_bytes and expire_after by prune(), which put() runs when due.
+    """
+
+    def __init__(self, root: str, max_bytes: int = HTML_CACHE_MAX_BYTES,
+                 expire_after: float = HTML_CACHE_EXPIRE_AFTER, prune_interval: float = HTML_CACHE_PRUNE_INTERVAL):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.expire_after = expire_after
+        self.prune_interval = prune_interval
+        self._lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+        self._bytes = None  # approximate size on disk; None until the first prune
+        self._last_prune = 0.0
+        self.stats = {"fresh_hits": 0, "revalidated": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _paths(self, url: str) -> tuple[str, str]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.root, key[:2], key)
+        return base + ".json", base + ".html.gz"
+
+    def get(self, url: str):
+        if not self.root:
+            return None
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with gzip.open(body_path, "rt", encoding="utf-8") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(body, meta["final_url"], meta.get("etag"), meta.get("last_modified"), meta["fetched_at"])
+
+    def put(self, url: str, body: str, final_url: str, headers):
+        if not self.root:
+            return
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        meta = {
+            "url": url,
+            "final_url": final_url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        }
+        body_gz = gzip.compress(body.encode("utf-8"))
+        meta_raw = json.dumps(meta).encode("utf-8")
+        _atomic_write(body_path, body_gz)
+        _atomic_write(meta_path, meta_raw)
+        self.record("stores")
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes += len(body_gz) + len(meta_raw)
+            due = (
+                self._bytes is None
+                or self._bytes > self.max_bytes
+                or time.time() - self._last_prune > self.prune_interval
+            )
+        if due and self._prune_lock.acquire(blocking=False):
+            try:
+                self.prune()
+            finally:
+                self._prune_lock.release()
+
+    def touch(self, entry: CacheEntry, url: str):
+        """A 304 confirmed the entry; restart its freshness window."""
+        if not self.root:
+            return
+        meta_path, _ = self._paths(url)
+        meta = {
+            "url": url,
+            "final_url": entry.final_url,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "fetched_at": time.time(),
+        }
+        _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def prune(self) -> dict:
+        """
+        Delete entries older than expire_after (by metadata mtime, i.e. last fetch or
+        304), then the oldest until the cache is under 90% of max_bytes. Also clears
+        temp files left by interrupted writes. Safe against concurrent writers.
+        """
+        now = time.time()
+        entries = {}  # url key -> [meta mtime, bytes, paths]
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if name.endswith(".tmp"):
+                    if now - st.st_mtime > 3600:
+                        _unlink(path)
+                    continue
+                entry = entries.setdefault(name.split(".", 1)[0], [0.0, 0, []])
+                if name.endswith(".json"):
+                    entry[0] = st.st_mtime
+                entry[1] += st.st_size
+                entry[2].append(path)
+
+        total = sum(e[1] for e in entries.values())
+        evicted = 0
+        budget = self.max_bytes * 0.9
+        for mtime, size, paths in sorted(entries.values(), key=lambda e: e[0]):
+            if now - mtime <= self.expire_after and total <= budget:
+                break
+            for path in paths:
+                _unlink(path)
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self._bytes = total
+            self._last_prune = now
+            self.stats["evictions"] += evicted
+        return {"entries": len(entries) - evicted, "bytes": total, "evicted": evicted}
+
+    def record(self, counter: str):
+        with self._lock:
+            self.stats[counter] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "dir": self.root or None,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_age_seconds": HTML_CACHE_MAX_AGE,
+            }
+
+
+def _atomic_write(path: str, data: bytes):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _unlink(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:  # another process pruned it first
+        pass
+
+
+html_cache = HtmlDiskCache(HTML_CACHE_DIR)
+
+# ---------- shared connection pools ---------- #
+class _CappedRetry(Retry):
+    """Honour Retry-After, but never sleep longer than FETCH_TIMEOUT per attempt."""
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, FETCH_TIMEOUT)
+
+def _make_session() -> requests.Session:
+    s = requests.Session()
+    s.headers.update(HEADERS)  # Accept-Encoding gzip/deflate (+br when brotli is installed) by default
+    retry = _CappedRetry(
+        total=FETCH_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=FETCH_POOL_SIZE, max_retries=retry)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    return s
+
+session = _make_session()
+
+_async_client: httpx.AsyncClient | None = None
+
+def get_async_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=FETCH_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=FETCH_POOL_SIZE, max_keepalive_connections=FETCH_POOL_SIZE),
+            transport=httpx.AsyncHTTPTransport(retries=FETCH_RETRIES),  # connect errors only
+        )
+    return _async_client
+
+async def _async_get(url: str, headers: dict) -> httpx.Response:
+    """GET with jittered exponential backoff on RETRY_STATUSES, mirroring the sync Retry policy."""
+    client = get_async_client()
+    for attempt in range(FETCH_RETRIES + 1):
+        resp = await client.get(url, headers=headers)
+        if resp.status_code not in RETRY_STATUSES or attempt == FETCH_RETRIES:
+            return resp
+        retry_after = resp.headers.get("Retry-After", "")
+        # capped: the caller holds a single-flight slot while this sleeps
+        delay = min(float(retry_after), FETCH_TIMEOUT) if retry_after.isdigit() else 0.5 * (2 ** attempt)
+        await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+    return resp
+
+# ---------- REST page HTML ---------- #
+_REST_TITLE_RE = re.compile(r"<title>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+_REST_PAGE_LINK_RE = re.compile(r'<link\s+rel="dc:isVersionOf"\s+href="([^"]+)"', re.IGNORECASE)
+_REST_BODY_RE = re.compile(r"<body[^>]*>(.*)</body>", re.IGNORECASE | re.DOTALL)
+
+def _rest_html_url(url: str) -> str | None:
+    """
+    REST page/html URL (/api/rest_v1/page/html/{title}[/{revision}]) for a /wiki/ or
+    index.php?title= article link, else None. Unlike action=parse it sends ETags and
+    answers If-None-Match with 304, so disk cache entries revalidate cheaply.
+    """
+    if not USE_PARSE_API:
+        return None
+    parts = urlsplit(url)
+    if not API_HOST_RE.search(parts.hostname or ""):
+        return None
+    query = parse_qs(parts.query)
+    if parts.path.startswith("/wiki/"):
+        title = unquote(parts.path[len("/wiki/"):])
+    elif parts.path.endswith("/index.php") and query.get("title"):
+        title = query["title"][0]
+    else:
+        return None  # e.g. index.php?oldid= alone: the endpoint needs a title
+    path = "/api/rest_v1/page/html/" + quote(title.replace(" ", "_"), safe="")
+    if query.get("oldid"):
+        if not query["oldid"][0].isdigit():
+            return None
+        path += "/" + query["oldid"][0]
+    return urlunsplit((parts.scheme, parts.netloc, path, "", ""))
+
+def _page_from_rest(body: str, url: str) -> FetchResult:
+    """Wrap REST (Parsoid) page HTML in the page skeleton the extractors expect."""
+    body_m = _REST_BODY_RE.search(body)
+    title_m = _REST_TITLE_RE.search(body, 0, body_m.start() if body_m else len(body))
+    if body_m is None or title_m is None:
+        raise ValueError("REST page/html returned no article")
+    parts = urlsplit(url)
+    # the article the HTML belongs to, after wiki redirects (the endpoint follows them)
+    link = _REST_PAGE_LINK_RE.search(body, 0, body_m.start())
+    page = urlsplit(link.group(1)) if link else None
+    if page is not None and page.path.startswith("/wiki/"):
+        final_url = urlunsplit((parts.scheme, parts.netloc, page.path, "", ""))
+    else:
+        final_url = urlunsplit((parts.scheme, parts.netloc, "/wiki/" + quote(unescape(title_m.group(1)).replace(" ", "_")), "", ""))
+    html = (
+        f'<html><body><h1 id="firstHeading">{title_m.group(1).strip()}</h1>'
+        f'<div id="mw-content-text">{body_m.group(1)}</div></body></html>'
+    )
+    return FetchResult(html, final_url)
+
+def _check_rest_body(body: str):
+    if not _REST_BODY_RE.search(body):
+        raise ValueError("REST page/html returned no article")
+
+# ---------- fetch ---------- #
+def _get_cached(url: str, validate=None) -> tuple[str, str]:
+    entry = html_cache.get(url)
+    if entry is not None and entry.is_fresh():
+        html_cache.record("fresh_hits")
+        return entry.body, entry.final_url
+
+    resp = session.get(url, headers=entry.validators() if entry else {}, timeout=FETCH_TIMEOUT)
+    if resp.status_code == 304 and entry is not None:
+        html_cache.record("revalidated")
+        html_cache.touch(entry, url)
+        return entry.body, entry.final_url
+    resp.raise_for_status()
+
+    html_cache.record("misses")
+    if validate:
+        validate(resp.text)
+    html_cache.put(url, resp.text, resp.url, resp.headers)
+    return resp.text, resp.url
+
+async def _get_cached_async(url: str, validate=None) -> tuple[str, str]:
+    entry = await run_in_threadpool(html_cache.get, url)
+    if entry is not None and entry.is_fresh():
+        html_cache.record("fresh_hits")
+        return entry.body, entry.final_url
+
+    resp = await _async_get(url, entry.validators() if entry else {})
+    if resp.status_code == 304 and entry is not None:
+        html_cache.record("revalidated")
+        await run_in_threadpool(html_cache.touch, entry, url)
+        return entry.body, entry.final_url
+    resp.raise_for_status()
+
+    html_cache.record("misses")
+    if validate:
+        validate(resp.text)
+    await run_in_threadpool(html_cache.put, url, resp.text, str(resp.url), resp.headers)
+    return resp.text, str(resp.url)
+
+def fetch_html(url: str) -> FetchResult:
+    """
+    Fetch an article page through the pooled session and the on-disk cache.
+    Wikipedia articles go through the REST page/html endpoint first (content HTML
+    only, no skin, with ETags); any API failure falls back to the regular page.
+    """
+    api_url = _rest_html_url(url)
+    if api_url:
+        try:
+            body, _ = _get_cached(api_url, validate=_check_rest_body)
+            return _page_from_rest(body, url)
+        except (requests.RequestException, ValueError, KeyError):
+            pass
+    body, final_url = _get_cached(url)
+    return FetchResult(body, final_url)
+
+async def fetch_html_async(url: str) -> FetchResult:
+    """Async variant of fetch_html (httpx client, disk cache I/O on the threadpool)."""
+    api_url = _rest_html_url(url)
+    if api_url:
+        try:
+            body, _ = await _get_cached_async(api_url, validate=_check_rest_body)
+            return _page_from_rest(body, url)
+        except (httpx.HTTPError, ValueError, KeyError):
+            pass
+    body, final_url = await _get_cached_async(url)
+    return FetchResult(body, final_url)
@@ -0,0 +1,78 @@
+# backend/history.py
+from pydantic import TypeAdapter
+from sqlalchemy import select, tuple_, literal
+
+from .database import SessionLocal, Quiz
+
+HISTORY_DEFAULT_LIMIT = 100
+HISTORY_MAX_LIMIT = 5000
+# pages larger than this are streamed instead of built in memory
+HISTORY_STREAM_THRESHOLD = 500
+STREAM_CHUNK_ROWS = 256
+
+HISTORY_COLUMNS = (Quiz.id, Quiz.url, Quiz.title, Quiz.date_generated)
+
+# streamed pages go through pydantic like response_model pages, so dates are formatted
+# the same way ("Z" for UTC) whatever the page size
+_rows_json = TypeAdapter(list[dict])
+
+
+def _like_prefix(prefix: str) -> str:
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+def history_filters(cursor: int | None, url_prefix: str | None, title_prefix: str | None) -> list:
+    """
+    WHERE clauses for one /history page. The cursor is the id of the last row of the
+    previous page; its date is read back from the table, so the comparison is always
+    against stored values (no datetime round-tripping).
+    """
+    clauses = []
+    if cursor is not None:
+        cursor_date = select(Quiz.date_generated).where(Quiz.id == cursor).scalar_subquery()
+        # row-value comparison so the (date_generated, id) index is range-seeked, not scanned
+        clauses.append(tuple_(Quiz.date_generated, Quiz.id) < tuple_(cursor_date, literal(cursor)))
+    if url_prefix:
+        clauses.append(Quiz.url.like(_like_prefix(url_prefix), escape="\\"))
+    if title_prefix:
+        clauses.append(Quiz.title.like(_like_prefix(title_prefix), escape="\\"))
+    return clauses
+
+
+def cursor_exists(db, cursor: int) -> bool:
+    return db.execute(select(Quiz.id).where(Quiz.id == cursor)).first() is not None
+
+
+def history_query(columns, filters: list):
+    return select(*columns).where(*filters).order_by(Quiz.date_generated.desc(), Quiz.id.desc())
+
+
+def fetch_page(db, limit: int, filters: list) -> tuple[list[dict], int | None]:
+    """(rows, next_cursor) for pages small enough to build in memory."""
+    rows = db.execute(history_query(HISTORY_COLUMNS, filters).limit(limit + 1)).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return [row._asdict() for row in rows[:limit]], next_cursor
+
+
+def next_cursor_for(db, limit: int, filters: list) -> int | None:
+    """Cursor for the page after this one, from an id-only scan of the index."""
+    ids = db.execute(history_query((Quiz.id,), filters).offset(limit - 1).limit(2)).scalars().all()
+    return ids[0] if len(ids) == 2 else None
+
+
+def stream_page(limit: int, filters: list):
+    """Yield the page as a JSON array in chunks of rows, on its own session."""
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            history_query(HISTORY_COLUMNS, filters).limit(limit),
+            execution_options={"yield_per": STREAM_CHUNK_ROWS},
+        )
+        sep = b"["
+        for rows in result.partitions():
+            yield sep + _rows_json.dump_json([row._asdict() for row in rows])[1:-1]
+            sep = b","
+        yield b"[]" if sep == b"[" else b"]"
+    finally:
+        db.close()
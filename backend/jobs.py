@@ -0,0 +1,177 @@
+# backend/jobs.py
+import os
+import uuid
+import json
+import asyncio
+import logging
+import itertools
+
+from .database import Job
+from .pipeline import run_generation, run_db, ScrapeError, GenerationError
+
+# Max generations running at once in job mode (override via .env)
+JOB_WORKERS = int(os.getenv("QUIZ_JOB_WORKERS", "4"))
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("done", "failed")
+
+
+def job_payload(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "url": job.url,
+        "priority": job.priority,
+        "status": job.status,
+        "stage": job.stage,
+        "quiz_id": job.quiz_id,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+# ---------- DB steps ---------- #
+def _insert_job(db, job_id: str, url: str, priority: int) -> Job:
+    job = Job(id=job_id, url=url, priority=priority, status="queued")
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+def _update_job(db, job_id: str, fields: dict):
+    db.query(Job).filter(Job.id == job_id).update(fields)
+    db.commit()
+
+def _get_job(db, job_id: str):
+    return db.get(Job, job_id)
+
+def _requeue_unfinished(db) -> list:
+    """Jobs a previous process left queued or mid-run go back on the queue."""
+    rows = (
+        db.query(Job.id, Job.priority)
+        .filter(Job.status.in_(("queued", "running")))
+        .order_by(Job.created_at)
+        .all()
+    )
+    if rows:
+        db.query(Job).filter(Job.status == "running").update({"status": "queued", "stage": None})
+        db.commit()
+    return [(r.id, r.priority) for r in rows]
+
+
+class JobQueue:
+    """
+    In-process priority queue drained by a fixed pool of asyncio workers, with every
+    job's state persisted in the jobs table. Higher priority runs first; ties run FIFO.
+    On start() unfinished jobs are re-queued from the database, so this assumes one
+    API process owns the queue.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self._queue: asyncio.PriorityQueue | None = None
+        self._tasks: list = []
+        self._seq = itertools.count()
+        self._subscribers: dict = {}
+
+    async def start(self):
+        if self._queue is not None:
+            return
+        self._queue = asyncio.PriorityQueue()
+        for job_id, priority in await run_db(_requeue_unfinished):
+            self._put(job_id, priority)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def _put(self, job_id: str, priority: int):
+        self._queue.put_nowait((-priority, next(self._seq), job_id))
+
+    async def submit(self, url: str, priority: int = 0) -> dict:
+        await self.start()
+        job = await run_db(_insert_job, str(uuid.uuid4()), url, priority)
+        self._put(job.id, priority)
+        return job_payload(job)
+
+    async def get(self, job_id: str):
+        job = await run_db(_get_job, job_id)
+        return job_payload(job) if job else None
+
+    def size(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    # ---------- progress events ---------- #
+    async def _set(self, job_id: str, **fields):
+        await run_db(_update_job, job_id, fields)
+        event = {"id": job_id, **fields}
+        for q in self._subscribers.get(job_id, ()):
+            q.put_nowait(event)
+
+    async def events(self, job_id: str, keepalive: float = 15.0):
+        """Yield server-sent-event frames for one job until it finishes."""
+        q = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(q)
+        try:
+            # current state first, so late subscribers still see where the job is
+            job = await self.get(job_id)
+            if job is None:
+                return
+            yield _sse({k: job[k] for k in ("id", "status", "stage", "quiz_id", "error")})
+            status = job["status"]
+            while status not in TERMINAL_STATUSES:
+                try:
+                    event = await asyncio.wait_for(q.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                status = event.get("status", status)
+                yield _sse(event)
+        finally:
+            subs = self._subscribers.get(job_id, [])
+            if q in subs:
+                subs.remove(q)
+            if not subs:
+                self._subscribers.pop(job_id, None)
+
+    # ---------- workers ---------- #
+    async def _worker(self):
+        while True:
+            _, _, job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception("job %s: worker error", job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await self.get(job_id)
+        if job is None or job["status"] in TERMINAL_STATUSES:
+            return
+        await self._set(job_id, status="running", stage=None)
+
+        async def on_stage(stage: str):
+            await self._set(job_id, stage=stage)
+
+        try:
+            quiz = await run_generation(job["url"], on_stage=on_stage)
+        except ScrapeError as e:
+            await self._set(job_id, status="failed", stage=None, error=f"Scraping failed: {e}")
+        except GenerationError as e:
+            await self._set(job_id, status="failed", stage=None, error=f"LLM generation failed: {e}")
+        except Exception as e:
+            await self._set(job_id, status="failed", stage=None, error=str(e))
+        else:
+            await self._set(job_id, status="done", stage=None, quiz_id=quiz["id"])
+
+
+def _sse(data: dict) -> str:
+    return f"event: progress\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+job_queue = JobQueue()
@@ -0,0 +1,629 @@
+# backend/llm_providers.py
+"""
+LLM backends behind the quiz generator, plus the shared call policy.
+
+Providers (QUIZ_LLM_PROVIDER):
+  gemini  Google Gemini via google-genai (needs GEMINI_API_KEY at first call, not at import)
+  fake    deterministic canned quizzes built from the prompt text, with configurable latency
+  replay  responses recorded with QUIZ_LLM_RECORD_DIR (QUIZ_LLM_REPLAY_DIR), at the recorded
+          latency or QUIZ_LLM_REPLAY_LATENCY; prompts never recorded fall back to fake
+
+Every call goes through LLMClient, which applies, per process:
+  - a token-bucket rate limiter on requests and on tokens (QUIZ_LLM_RPM / QUIZ_LLM_TPM)
+  - a cap on calls in flight (QUIZ_LLM_CONCURRENCY), shared by threads and event loops
+  - a per-call timeout (QUIZ_LLM_TIMEOUT)
+  - jittered exponential retries on 429/5xx/timeouts, limited by a retry budget
+  - an optional caller deadline, after which no attempt or retry starts (sync calls)
+  - latency/token metrics (LLMClient.snapshot(), GET /llm/stats)
+"""
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import deque
+from typing import NamedTuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LLM_PROVIDER = os.getenv("QUIZ_LLM_PROVIDER", "gemini")
+# 0 = unlimited; set to your quota divided by the number of server processes
+LLM_RPM = float(os.getenv("QUIZ_LLM_RPM", "0"))
+LLM_TPM = float(os.getenv("QUIZ_LLM_TPM", "0"))
+LLM_CONCURRENCY = int(os.getenv("QUIZ_LLM_CONCURRENCY", "8"))
+LLM_TIMEOUT = float(os.getenv("QUIZ_LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("QUIZ_LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("QUIZ_LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.getenv("QUIZ_LLM_BACKOFF_MAX", "30"))
+# retries earned per first attempt, banked up to LLM_RETRY_CAP (keeps outages from tripling load)
+LLM_RETRY_RATIO = float(os.getenv("QUIZ_LLM_RETRY_RATIO", "0.2"))
+LLM_RETRY_CAP = 10
+
+LLM_FAKE_LATENCY = float(os.getenv("QUIZ_LLM_FAKE_LATENCY", "0.5"))
+LLM_FAKE_JITTER = float(os.getenv("QUIZ_LLM_FAKE_JITTER", "0"))
+LLM_REPLAY_DIR = os.getenv("QUIZ_LLM_REPLAY_DIR", "")
+LLM_RECORD_DIR = os.getenv("QUIZ_LLM_RECORD_DIR", "")
+
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+
+
+class LLMResponse(NamedTuple):
+    text: str
+    input_tokens: int
+    output_tokens: int
+
+    @property
+    def tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+
+class LLMError(RuntimeError):
+    """Provider failure with an HTTP-like status (used by fake backends and timeouts)."""
+
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(message)
+        self.status = status
+
+
+class LLMDeadlineExceeded(LLMError):
+    """The caller's deadline passed before an attempt or retry could start (not retried)."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 chars per token)."""
+    return len(text) // 4 + 1
+
+# ---------- providers ---------- #
+class LLMProvider:
+    """JSON-mode text generation. Subclasses implement generate and agenerate."""
+
+    name = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def generate(self, system: str, prompt: str, max_output_tokens: int, temperature: float) -> LLMResponse:
+        raise NotImplementedError
+
+    async def agenerate(self, system: str, prompt: str, max_output_tokens: int, temperature: float) -> LLMResponse:
+        raise NotImplementedError
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, model: str, api_key: str | None = None):
+        super().__init__(model)
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        # created on first use so the app (and /history) starts without a key
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    if not self.api_key:
+                        raise RuntimeError("GEMINI_API_KEY not set in .env file")
+                    from google import genai
+                    from google.genai import types
+
+                    self._client = genai.Client(
+                        api_key=self.api_key,
+                        http_options=types.HttpOptions(timeout=int(LLM_TIMEOUT * 1000)),
+                    )
+        return self._client
+
+    def _config(self, system: str, max_output_tokens: int, temperature: float):
+        from google.genai import types
+
+        return types.GenerateContentConfig(
+            system_instruction=system,
+            response_mime_type="application/json",
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+        )
+
+    @staticmethod
+    def _response(response) -> LLMResponse:
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = (getattr(usage, "prompt_token_count", None) or 0) if usage else 0
+        total = (getattr(usage, "total_token_count", None) or 0) if usage else 0
+        return LLMResponse(response.text, prompt_tokens, max(0, total - prompt_tokens))
+
+    def generate(self, system, prompt, max_output_tokens, temperature):
+        response = self._get_client().models.generate_content(
+            model=self.model, contents=prompt, config=self._config(system, max_output_tokens, temperature),
+        )
+        return self._response(response)
+
+    async def agenerate(self, system, prompt, max_output_tokens, temperature):
+        response = await self._get_client().aio.models.generate_content(
+            model=self.model, contents=prompt, config=self._config(system, max_output_tokens, temperature),
+        )
+        return self._response(response)
+
+
+_SENTENCE_RE = re.compile(r"[^.!?\n]{40,}[.!?]")
+_ARTICLE_RE = re.compile(r"^=== ARTICLE (\d+) ===$", re.M)
+_REQUESTED_RE = re.compile(r"Generate up to (\d+) questions")
+
+
+def _canned_questions(body: str, n: int) -> list[dict]:
+    """n distinct questions quoting sentences spread across body (padded when it runs out)."""
+    sentences = list(dict.fromkeys(s.strip() for s in _SENTENCE_RE.findall(body)))
+    step = max(1, len(sentences) // max(1, n))
+    picked = sentences[::step][:n]
+    digest = hashlib.sha256(body.encode("utf-8")).hexdigest()[:8]
+    picked += [f"Placeholder fact {i} of text {digest}." for i in range(len(picked), n)]
+    return [
+        {"question": f"Which statement does the text make: {s}", "options": [s, "None of these", "All of these", "Unknown"],
+         "answer": s}
+        for s in picked
+    ]
+
+
+def canned_response(prompt: str) -> str:
+    """
+    Quiz-shaped JSON for the generator's single, batch and chunk prompts, derived only
+    from the prompt text (so identical prompts always get identical answers).
+    """
+    articles = _ARTICLE_RE.split(prompt)
+    if len(articles) > 1:
+        quizzes = []
+        for idx, body in zip(articles[1::2], articles[2::2]):
+            questions = _canned_questions(body, 10)
+            quizzes.append({"article": int(idx), "summary": questions[0]["answer"], "questions": questions})
+        return json.dumps({"quizzes": quizzes})
+
+    requested = _REQUESTED_RE.search(prompt)
+    body = prompt.split("\n", 1)[-1].rsplit("\n\nGenerate", 1)[0]
+    questions = _canned_questions(body, int(requested.group(1)) if requested else 10)
+    return json.dumps({"summary": questions[0]["answer"], "questions": questions})
+
+
+class FakeProvider(LLMProvider):
+    """
+    Offline stand-in: canned_response after `latency` seconds (+/- jitter), plus
+    `per_question` seconds for each question returned, like real decoding.
+    """
+
+    name = "fake"
+
+    def __init__(self, model: str, latency: float = LLM_FAKE_LATENCY, jitter: float = LLM_FAKE_JITTER,
+                 per_question: float = 0.0):
+        super().__init__(model)
+        self.latency = latency
+        self.jitter = jitter
+        self.per_question = per_question
+
+    def _respond(self, system: str, prompt: str) -> tuple[LLMResponse, float]:
+        text = canned_response(prompt)
+        delay = self.latency + self.per_question * text.count('"question"')
+        if self.jitter:
+            delay = max(0.0, delay + random.uniform(-self.jitter, self.jitter))
+        return LLMResponse(text, estimate_tokens(system + prompt), estimate_tokens(text)), delay
+
+    def generate(self, system, prompt, max_output_tokens, temperature):
+        response, delay = self._respond(system, prompt)
+        time.sleep(delay)
+        return response
+
+    async def agenerate(self, system, prompt, max_output_tokens, temperature):
+        response, delay = self._respond(system, prompt)
+        await asyncio.sleep(delay)
+        return response
+
+
+def _record_key(model: str, system: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model}\0{system}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class ReplayProvider(FakeProvider):
+    """
+    Serves responses recorded by RecordingProvider, after the recorded latency unless
+    `replay_latency` is given; unknown prompts get the fake's canned answer.
+    """
+
+    name = "replay"
+
+    def __init__(self, model: str, root: str, replay_latency: float | None = None, **kwargs):
+        super().__init__(model, **kwargs)
+        self.root = root
+        self.replay_latency = replay_latency
+        self.hits = self.misses = 0
+
+    def _respond(self, system, prompt):
+        path = os.path.join(self.root, _record_key(self.model, system, prompt) + ".json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                rec = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return super()._respond(system, prompt)
+        self.hits += 1
+        delay = self.replay_latency if self.replay_latency is not None else rec.get("latency_s", 0.0)
+        return LLMResponse(rec["text"], rec.get("input_tokens", 0), rec.get("output_tokens", 0)), delay
+
+
+class RecordingProvider(LLMProvider):
+    """Wraps another provider and writes each response to root for later replay."""
+
+    def __init__(self, inner: LLMProvider, root: str):
+        super().__init__(inner.model)
+        self.inner = inner
+        self.root = root
+        self.name = inner.name
+
+    def _save(self, system: str, prompt: str, response: LLMResponse, latency: float):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, _record_key(self.model, system, prompt) + ".json")
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({**response._asdict(), "latency_s": round(latency, 3)}, f)
+        os.replace(tmp, path)
+
+    def generate(self, system, prompt, max_output_tokens, temperature):
+        start = time.perf_counter()
+        response = self.inner.generate(system, prompt, max_output_tokens, temperature)
+        self._save(system, prompt, response, time.perf_counter() - start)
+        return response
+
+    async def agenerate(self, system, prompt, max_output_tokens, temperature):
+        start = time.perf_counter()
+        response = await self.inner.agenerate(system, prompt, max_output_tokens, temperature)
+        self._save(system, prompt, response, time.perf_counter() - start)
+        return response
+
+# ---------- call policy ---------- #
+class TokenBucket:
+    """
+    `rate` units per second, bursts up to `capacity`. acquire() reserves units and
+    returns how long the caller must wait, so threads and event loops share one bucket
+    (sleep with time.sleep or asyncio.sleep respectively). rate <= 0 disables it.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._level = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, units: float = 1.0) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+            self._updated = now
+            # a request larger than the bucket waits for a full bucket, not forever
+            self._level -= min(units, self.capacity)
+            return 0.0 if self._level >= 0 else -self._level / self.rate
+
+    def refund(self, units: float = 1.0):
+        """Give back a reservation that will not be used."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._level = min(self.capacity, self._level + min(units, self.capacity))
+
+
+class ConcurrencyLimiter:
+    """At most `limit` holders at once, across threads and event loops. limit <= 0 disables it."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._cond = threading.Condition()
+        self._waiters = deque()  # (loop, future) of waiting coroutines
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        """Block until a slot is free; False if `timeout` seconds pass first."""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while 0 < self.limit <= self.active:
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            self.active += 1
+            return True
+
+    async def acquire_async(self):
+        while True:
+            with self._cond:
+                if not 0 < self.limit <= self.active:
+                    self.active += 1
+                    return
+                loop = asyncio.get_running_loop()
+                fut = loop.create_future()
+                waiter = (loop, fut)
+                self._waiters.append(waiter)
+            try:
+                await fut
+            except asyncio.CancelledError:
+                with self._cond:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                    else:
+                        # release() picked us (the wake may not have run yet): pass it on
+                        self._wake_next()
+                raise
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+            # wake one waiting coroutine too; whoever loses the race waits again
+            self._wake_next()
+
+    def _wake_next(self):
+        # caller holds self._cond
+        while self._waiters:
+            loop, fut = self._waiters.popleft()
+            if not fut.done() and not loop.is_closed():
+                loop.call_soon_threadsafe(_wake, fut)
+                break
+
+
+def _wake(fut):
+    if not fut.done():
+        fut.set_result(None)
+
+
+class RetryBudget:
+    """Each first attempt earns `ratio` retries (up to a cap); each retry spends one."""
+
+    def __init__(self, ratio: float, cap: int):
+        self.ratio = ratio
+        self.cap = cap
+        self._balance = float(cap)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._balance = min(self.cap, self._balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+def _status_of(exc: Exception) -> int | None:
+    for attr in ("status", "code", "status_code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError)):
+        return True
+    if type(exc).__name__ in ("TimeoutException", "ConnectError", "ReadTimeout", "ConnectTimeout"):
+        return True
+    return _status_of(exc) in RETRY_STATUSES
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full jitter: uniform in [0, min(max, base * 2^attempt)]."""
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+
+class LLMMetrics:
+    """Counters plus a window of recent call latencies, for sizing throughput against quota."""
+
+    def __init__(self, window: int = 2048):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.counters = {
+            "calls": 0,
+            "attempts": 0,
+            "errors": 0,
+            "retries": 0,
+            "retries_denied": 0,
+            "rate_limited_responses": 0,
+            "timeouts": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "throttle_wait_s": 0.0,
+            "abandoned": 0,
+        }
+
+    def add(self, **deltas):
+        with self._lock:
+            for k, v in deltas.items():
+                self.counters[k] += v
+
+    def observe(self, latency: float, response: LLMResponse):
+        with self._lock:
+            self._latencies.append(latency)
+            self.counters["input_tokens"] += response.input_tokens
+            self.counters["output_tokens"] += response.output_tokens
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            ordered = sorted(self._latencies)
+            counters = dict(self.counters)
+
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 3) if ordered else None
+
+        counters["throttle_wait_s"] = round(counters["throttle_wait_s"], 3)
+        return {**counters, "latency_p50_s": pct(50), "latency_p95_s": pct(95), "latency_p99_s": pct(99)}
+
+
+class LLMClient:
+    """Provider plus rate limits, concurrency cap, timeout, retries and metrics."""
+
+    def __init__(self, provider: LLMProvider, rpm: float = LLM_RPM, tpm: float = LLM_TPM,
+                 concurrency: int = LLM_CONCURRENCY, timeout: float = LLM_TIMEOUT,
+                 max_retries: int = LLM_MAX_RETRIES):
+        self.provider = provider
+        self.rpm, self.tpm = rpm, tpm
+        self.requests = TokenBucket(rpm / 60, max(1.0, rpm / 60))
+        self.tokens = TokenBucket(tpm / 60, max(1.0, tpm / 6))  # ~10s of token quota as burst
+        self.limiter = ConcurrencyLimiter(concurrency)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_budget = RetryBudget(LLM_RETRY_RATIO, LLM_RETRY_CAP)
+        self.metrics = LLMMetrics()
+
+    def _throttle(self, prompt: str, max_output_tokens: int, deadline: float | None = None) -> float:
+        tokens = estimate_tokens(prompt) + max_output_tokens
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if deadline is not None and time.monotonic() + wait >= deadline:
+            # the caller gave up before this attempt could start: leave the quota to others
+            self.requests.refund(1)
+            self.tokens.refund(tokens)
+            self.metrics.add(abandoned=1)
+            raise LLMDeadlineExceeded("LLM call abandoned: deadline passed before it could start")
+        if wait:
+            self.metrics.add(throttle_wait_s=wait)
+        return wait
+
+    def _should_retry(self, exc: Exception, attempt: int) -> bool:
+        self.metrics.add(errors=1)
+        if _status_of(exc) == 429:
+            self.metrics.add(rate_limited_responses=1)
+        if attempt >= self.max_retries or not is_retryable(exc):
+            return False
+        if not self.retry_budget.withdraw():
+            self.metrics.add(retries_denied=1)
+            return False
+        self.metrics.add(retries=1)
+        return True
+
+    def _done(self, start: float, response: LLMResponse, attempt: int) -> LLMResponse:
+        latency = time.perf_counter() - start
+        self.metrics.observe(latency, response)
+        logger.debug("llm call provider=%s latency=%.3fs tokens=%d/%d attempts=%d", self.provider.name,
+                     latency, response.input_tokens, response.output_tokens, attempt + 1)
+        return response
+
+    def generate(self, system: str, prompt: str, max_output_tokens: int, temperature: float = 0.4,
+                 deadline: float | None = None) -> LLMResponse:
+        """
+        Blocking call. `deadline` (time.monotonic()) is for callers that stop waiting
+        on a thread they cannot interrupt: no attempt or retry starts after it, so an
+        abandoned call frees its slot and quota once the attempt in progress returns.
+        """
+        self.metrics.add(calls=1)
+        self.retry_budget.deposit()
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            wait = self._throttle(prompt, max_output_tokens, deadline)
+            if wait:
+                time.sleep(wait)
+            if not self.limiter.acquire(None if deadline is None else deadline - time.monotonic()):
+                self.metrics.add(abandoned=1)
+                raise LLMDeadlineExceeded("LLM call abandoned: deadline passed waiting for a slot")
+            try:
+                self.metrics.add(attempts=1)
+                # the sync path relies on the provider's own HTTP timeout
+                return self._done(start, self.provider.generate(system, prompt, max_output_tokens, temperature), attempt)
+            except Exception as e:
+                delay = backoff_delay(attempt)
+                if (deadline is not None and attempt < self.max_retries and is_retryable(e)
+                        and time.monotonic() + delay >= deadline):
+                    self.metrics.add(errors=1, abandoned=1)
+                    raise  # no retry would start in time
+                if not self._should_retry(e, attempt):
+                    raise
+            finally:
+                self.limiter.release()
+            time.sleep(delay)
+            attempt += 1
+
+    async def agenerate(self, system: str, prompt: str, max_output_tokens: int, temperature: float = 0.4) -> LLMResponse:
+        self.metrics.add(calls=1)
+        self.retry_budget.deposit()
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            wait = self._throttle(prompt, max_output_tokens)
+            if wait:
+                await asyncio.sleep(wait)
+            await self.limiter.acquire_async()
+            try:
+                self.metrics.add(attempts=1)
+                call = self.provider.agenerate(system, prompt, max_output_tokens, temperature)
+                try:
+                    response = await asyncio.wait_for(call, self.timeout) if self.timeout > 0 else await call
+                except asyncio.TimeoutError:
+                    self.metrics.add(timeouts=1)
+                    raise LLMError(f"LLM call timed out after {self.timeout}s", status=408)
+                return self._done(start, response, attempt)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+            finally:
+                self.limiter.release()
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    def snapshot(self) -> dict:
+        out = {
+            "provider": self.provider.name,
+            "model": self.provider.model,
+            "in_flight": self.limiter.active,
+            "concurrency_limit": self.limiter.limit,
+            "rpm_limit": self.rpm or None,
+            "tpm_limit": self.tpm or None,
+            **self.metrics.snapshot(),
+        }
+        if isinstance(self.provider, ReplayProvider):
+            out["replay"] = {"hits": self.provider.hits, "misses": self.provider.misses}
+        return out
+
+# ---------- process-wide client ---------- #
+def make_provider(name: str, model: str) -> LLMProvider:
+    if name == "gemini":
+        provider = GeminiProvider(model)
+    elif name == "fake":
+        provider = FakeProvider(model)
+    elif name == "replay":
+        if not LLM_REPLAY_DIR:
+            raise RuntimeError("QUIZ_LLM_PROVIDER=replay needs QUIZ_LLM_REPLAY_DIR")
+        latency = os.getenv("QUIZ_LLM_REPLAY_LATENCY")
+        provider = ReplayProvider(model, LLM_REPLAY_DIR, float(latency) if latency else None)
+    else:
+        raise RuntimeError(f"Unknown QUIZ_LLM_PROVIDER {name!r} (expected gemini, fake or replay)")
+    if LLM_RECORD_DIR:
+        provider = RecordingProvider(provider, LLM_RECORD_DIR)
+    return provider
+
+
+_client: LLMClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_llm(model: str) -> LLMClient:
+    """The shared LLMClient, built from QUIZ_LLM_PROVIDER on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient(make_provider(LLM_PROVIDER, model))
+    return _client
+
+
+def set_provider(provider: LLMProvider, **limits) -> LLMClient:
+    """Swap the backend (benchmarks, tests); limits override the LLMClient defaults."""
+    global _client
+    with _client_lock:
+        _client = LLMClient(provider, **limits)
+    return _client
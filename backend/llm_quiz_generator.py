@@ -1,17 +1,20 @@
 import os
+import re
 import json
+import math
+import time
+import asyncio
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import NamedTuple
 from dotenv import load_dotenv
-from google import genai
-from google.genai import types
 
-load_dotenv()
+from .llm_providers import get_llm, estimate_tokens, LLM_PROVIDER
 
-# Setup Gemini Client
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise RuntimeError("GEMINI_API_KEY not set in .env file")
+load_dotenv()
 
-client = genai.Client(api_key=GEMINI_API_KEY)
+logger = logging.getLogger(__name__)
 
 # Use Gemini 2.5 Flash-Lite for high-volume free tier usage
 MODEL_ID = "gemini-2.5-flash-lite" 
@@ -33,22 +36,75 @@ Return the data in the following JSON format:
 }
 """
 
-def generate_quiz(article_text: str) -> dict:
+# Several articles per call for batch generation (see generate_quiz_batch)
+BATCH_SYSTEM_PROMPT = """
+You are a quiz generator. You will receive several articles, each starting with a line "=== ARTICLE <n> ===".
+For EACH article generate a comprehensive quiz with exactly 10 multiple-choice questions based only on that article.
+Each question must have 4 options and one correct answer.
+Return the data in the following JSON format, with one entry per article:
+{
+  "quizzes": [
+    {
+      "article": <n>,
+      "summary": "short overview of the topic",
+      "questions": [
+        {
+          "question": "...",
+          "options": ["A", "B", "C", "D"],
+          "answer": "correct option string"
+        }
+      ]
+    }
+  ]
+}
+"""
+
+# One section of a long article per call (see generate_quiz_chunked)
+CHUNK_SYSTEM_PROMPT = """
+You are a quiz generator. You will receive one section of a longer article, introduced by a line "Section <i> of <n>:".
+Generate multiple-choice questions that can be answered from this section alone, up to the number requested.
+Each question must have 4 options and one correct answer.
+Return the data in the following JSON format:
+{
+  "summary": "one or two sentences summarising this section",
+  "questions": [
+    {
+      "question": "...",
+      "options": ["A", "B", "C", "D"],
+      "answer": "correct option string"
+    }
+  ]
+}
+"""
+
+# QUIZ_CHUNKED_GENERATION=1 -> articles longer than CHUNK_CHARS are quizzed section by section
+CHUNKED_GENERATION = os.getenv("QUIZ_CHUNKED_GENERATION", "0") == "1"
+
+# Cached quizzes are only reused when this matches; changes whenever the model, a prompt or the mode does
+PROMPT_VERSION = (
+    ("" if LLM_PROVIDER == "gemini" else f"{LLM_PROVIDER}:")
+    + f"{MODEL_ID}:"
+    f"{hashlib.sha256((SYSTEM_PROMPT + BATCH_SYSTEM_PROMPT + CHUNK_SYSTEM_PROMPT).encode('utf-8')).hexdigest()[:12]}"
+    + (":chunked" if CHUNKED_GENERATION else "")
+)
+
+# Article text sent to the model (per article, single and batch)
+ARTICLE_CHAR_LIMIT = 8000
+
+# Batch packing budget (override via .env)
+BATCH_MAX_INPUT_TOKENS = int(os.getenv("QUIZ_BATCH_MAX_INPUT_TOKENS", "24000"))
+BATCH_MAX_OUTPUT_TOKENS = int(os.getenv("QUIZ_BATCH_MAX_OUTPUT_TOKENS", "8192"))
+OUTPUT_TOKENS_PER_QUIZ = 2000  # same headroom a single call gets
+
+def _build_prompt(article_text: str) -> str:
     # Use a larger slice of text if needed for 10 questions
-    prompt = f"Article Content:\n{article_text[:8000]}\n\nGenerate the 10-question quiz now."
-
-    response = client.models.generate_content(
-        model=MODEL_ID,
-        contents=prompt,
-        config=types.GenerateContentConfig(
-            system_instruction=SYSTEM_PROMPT,
-            response_mime_type="application/json",
-            temperature=0.4,
-            # Increased max_output_tokens to fit 10 questions
-            max_output_tokens=2000 
-        )
-    )
+    return f"Article Content:\n{article_text[:ARTICLE_CHAR_LIMIT]}\n\nGenerate the 10-question quiz now."
+
+def _llm():
+    # provider, rate limits and retries live in llm_providers
+    return get_llm(MODEL_ID)
 
+def _parse_response(response) -> dict:
     try:
         quiz_data = json.loads(response.text)
         return {
@@ -59,6 +115,385 @@ def generate_quiz(article_text: str) -> dict:
     except json.JSONDecodeError:
         raise RuntimeError("Model failed to return valid JSON. Try reducing article length.")
 
+def _generate_single(article_text: str) -> tuple[dict, int]:
+    # max_output_tokens sized to fit 10 questions
+    response = _llm().generate(SYSTEM_PROMPT, _build_prompt(article_text), OUTPUT_TOKENS_PER_QUIZ)
+    return _parse_response(response), response.tokens
+
+async def _generate_single_async(article_text: str) -> tuple[dict, int]:
+    response = await _llm().agenerate(SYSTEM_PROMPT, _build_prompt(article_text), OUTPUT_TOKENS_PER_QUIZ)
+    return _parse_response(response), response.tokens
+
+def generate_quiz(article_text: str) -> dict:
+    return _generate_single(article_text)[0]
+
+async def generate_quiz_async(article_text: str) -> dict:
+    """Same as generate_quiz but awaits the LLM call instead of blocking a thread."""
+    return (await _generate_single_async(article_text))[0]
+
+# ---------- Batch generation ---------- #
+class BatchResult(NamedTuple):
+    quizzes: list  # per input article: quiz dict, or the Exception that stopped it
+    tokens: int
+    llm_calls: int
+    fallbacks: int  # articles that needed their own call
+
+def pack_batches(article_texts: list[str]) -> list[list[int]]:
+    """Greedily group article indexes so each group fits the batch input/output token budget."""
+    per_call = max(1, BATCH_MAX_OUTPUT_TOKENS // OUTPUT_TOKENS_PER_QUIZ)
+    batches, current, current_tokens = [], [], 0
+    for i, text in enumerate(article_texts):
+        tokens = estimate_tokens(text[:ARTICLE_CHAR_LIMIT]) + 10
+        if current and (len(current) >= per_call or current_tokens + tokens > BATCH_MAX_INPUT_TOKENS):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def _build_batch_prompt(article_texts: list[str]) -> str:
+    sections = [f"=== ARTICLE {n} ===\n{text[:ARTICLE_CHAR_LIMIT]}" for n, text in enumerate(article_texts)]
+    return "\n\n".join(sections) + f"\n\nGenerate the {len(article_texts)} quizzes now."
+
+def _batch_output_tokens(n: int) -> int:
+    return min(BATCH_MAX_OUTPUT_TOKENS, OUTPUT_TOKENS_PER_QUIZ * n)
+
+def _parse_batch_response(response, n: int) -> list:
+    """Per-article quiz dicts; None for any section that is missing or malformed."""
+    out = [None] * n
+    try:
+        data = json.loads(response.text)
+    except (json.JSONDecodeError, TypeError):
+        return out
+    for entry in data.get("quizzes", []) if isinstance(data, dict) else []:
+        idx = entry.get("article") if isinstance(entry, dict) else None
+        if isinstance(idx, int) and 0 <= idx < n and entry.get("questions"):
+            out[idx] = {
+                "title": "Gemini 10-Question Quiz",
+                "summary": entry.get("summary", ""),
+                "questions": entry["questions"],
+            }
+    return out
+
+def generate_quiz_batch(article_texts: list[str]) -> BatchResult:
+    """
+    One LLM call for a group of articles (use pack_batches to size groups), one JSON
+    section per article. Sections that fail to parse are retried with generate_quiz.
+    """
+    if len(article_texts) == 1:
+        try:
+            quiz, tokens = _generate_single(article_texts[0])
+        except Exception as e:
+            quiz, tokens = e, 0
+        return BatchResult([quiz], tokens, 1, 0)
+
+    try:
+        response = _llm().generate(
+            BATCH_SYSTEM_PROMPT, _build_batch_prompt(article_texts), _batch_output_tokens(len(article_texts))
+        )
+        quizzes, tokens = _parse_batch_response(response, len(article_texts)), response.tokens
+    except Exception:
+        quizzes, tokens = [None] * len(article_texts), 0
+
+    calls, fallbacks = 1, 0
+    for i, quiz in enumerate(quizzes):
+        if quiz is None:
+            fallbacks += 1
+            calls += 1
+            try:
+                quizzes[i], used = _generate_single(article_texts[i])
+                tokens += used
+            except Exception as e:
+                quizzes[i] = e
+    return BatchResult(quizzes, tokens, calls, fallbacks)
+
+async def generate_quiz_batch_async(article_texts: list[str]) -> BatchResult:
+    """Async variant of generate_quiz_batch; fallback calls run concurrently."""
+    if len(article_texts) == 1:
+        try:
+            quiz, tokens = await _generate_single_async(article_texts[0])
+        except Exception as e:
+            quiz, tokens = e, 0
+        return BatchResult([quiz], tokens, 1, 0)
+
+    try:
+        response = await _llm().agenerate(
+            BATCH_SYSTEM_PROMPT, _build_batch_prompt(article_texts), _batch_output_tokens(len(article_texts))
+        )
+        quizzes, tokens = _parse_batch_response(response, len(article_texts)), response.tokens
+    except Exception:
+        quizzes, tokens = [None] * len(article_texts), 0
+
+    missing = [i for i, quiz in enumerate(quizzes) if quiz is None]
+    results = await asyncio.gather(
+        *(_generate_single_async(article_texts[i]) for i in missing), return_exceptions=True
+    )
+    for i, result in zip(missing, results):
+        if isinstance(result, Exception):
+            quizzes[i] = result
+        else:
+            quizzes[i], used = result
+            tokens += used
+    return BatchResult(quizzes, tokens, 1 + len(missing), len(missing))
+
+# ---------- Chunked (map-reduce) generation ---------- #
+QUIZ_QUESTIONS = 10
+CHUNK_CHARS = int(os.getenv("QUIZ_CHUNK_CHARS", "6000"))
+CHUNK_CONCURRENCY = int(os.getenv("QUIZ_CHUNK_CONCURRENCY", "4"))
+# estimated input + output tokens across all chunk calls of one article
+CHUNK_TOKEN_BUDGET = int(os.getenv("QUIZ_CHUNK_TOKEN_BUDGET", "40000"))
+# wall-clock limit for the map step; chunks still running are dropped
+CHUNK_TIMEOUT = float(os.getenv("QUIZ_CHUNK_TIMEOUT", "60"))
+CHUNK_OUTPUT_TOKENS = 1500
+# word-set overlap above which two candidate questions count as the same question
+DEDUPE_SIMILARITY = 0.6
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an the of in on at to for by with from and or is are was were be been which what who whom "
+    "whose when where why how did does do this that these those it its as".split()
+)
+
+class ChunkReport(NamedTuple):
+    index: int
+    chars: int
+    latency_s: float
+    tokens: int
+    candidates: int  # valid questions returned
+    error: str | None
+
+class ChunkedResult(NamedTuple):
+    quiz: dict
+    chunks: list  # ChunkReport per chunk that was sent
+    skipped_chunks: int  # left out to stay inside CHUNK_TOKEN_BUDGET
+    tokens: int
+    elapsed_s: float
+
+    def report(self) -> dict:
+        return {
+            "chunks": [c._asdict() for c in self.chunks],
+            "skipped_chunks": self.skipped_chunks,
+            "tokens": self.tokens,
+            "elapsed_s": round(self.elapsed_s, 3),
+        }
+
+def _split_long(paragraph: str, max_chars: int) -> list[str]:
+    """Cut an oversized paragraph at sentence ends (hard cut only when a sentence is too long)."""
+    pieces, current = [], ""
+    for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+def split_chunks(article_text: str, max_chars: int = CHUNK_CHARS) -> list[str]:
+    """
+    Consecutive runs of whole paragraphs (the extractors separate them with blank
+    lines) of at most max_chars each. A short tail is folded into the previous chunk.
+    """
+    paragraphs = []
+    for p in article_text.split("\n\n"):
+        p = p.strip()
+        if p:
+            paragraphs.extend(_split_long(p, max_chars) if len(p) > max_chars else [p])
+
+    chunks, current, size = [], [], 0
+    for p in paragraphs:
+        if current and size + len(p) > max_chars:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(p)
+        size += len(p) + 2
+    if current:
+        tail = "\n\n".join(current)
+        if chunks and len(tail) < max_chars // 4:
+            chunks[-1] += "\n\n" + tail
+        else:
+            chunks.append(tail)
+    return chunks
+
+def _chunk_cost(chunk: str) -> int:
+    return estimate_tokens(chunk) + CHUNK_OUTPUT_TOKENS
+
+def plan_chunks(chunks: list[str], token_budget: int = CHUNK_TOKEN_BUDGET) -> list[int]:
+    """Indexes of the chunks to send: all of them, or as many as fit spread evenly (lead always kept)."""
+    n = len(chunks)
+    for k in range(n, 1, -1):
+        picked = sorted({round(j * (n - 1) / (k - 1)) for j in range(k)})
+        if sum(_chunk_cost(chunks[i]) for i in picked) <= token_budget:
+            return picked
+    return [0] if n else []
+
+def questions_per_chunk(n_chunks: int) -> int:
+    # ~1.5x the final count in total, so dedup and coverage have room to choose
+    return min(QUIZ_QUESTIONS, max(3, math.ceil(QUIZ_QUESTIONS * 1.5 / max(1, n_chunks))))
+
+def _valid_question(q) -> bool:
+    return (
+        isinstance(q, dict)
+        and isinstance(q.get("question"), str) and q["question"].strip() != ""
+        and isinstance(q.get("options"), list) and len(q["options"]) == 4
+        and q.get("answer") in q["options"]
+    )
+
+def _question_words(q: dict) -> frozenset:
+    return frozenset(_WORD_RE.findall(q["question"].lower())) - _STOPWORDS
+
+def _is_duplicate(words: frozenset, seen: list) -> bool:
+    return any(len(words & s) / max(1, len(words | s)) >= DEDUPE_SIMILARITY for s in seen)
+
+def select_questions(candidates: list[list[dict]], n: int = QUIZ_QUESTIONS) -> list[dict]:
+    """
+    Reduce step: take questions round-robin across chunks, in article order, skipping
+    near-duplicates, so every section contributes before any contributes twice.
+    """
+    queues = [list(c) for c in candidates]
+    picked, seen = [], []
+    while len(picked) < n and any(queues):
+        for queue in queues:
+            while queue:
+                q = queue.pop(0)
+                words = _question_words(q)
+                if _is_duplicate(words, seen):
+                    continue
+                seen.append(words)
+                picked.append(q)
+                break
+            if len(picked) >= n:
+                break
+    return picked
+
+def _build_chunk_prompt(chunk: str, index: int, total: int, n_questions: int) -> str:
+    return f"Section {index + 1} of {total}:\n{chunk}\n\nGenerate up to {n_questions} questions from this section now."
+
+def _parse_chunk_response(response) -> dict:
+    try:
+        data = json.loads(response.text)
+    except (json.JSONDecodeError, TypeError):
+        raise RuntimeError("Model failed to return valid JSON for a chunk")
+    if not isinstance(data, dict):
+        raise RuntimeError("Model returned a non-object for a chunk")
+    return {
+        "summary": data.get("summary") or "",
+        "questions": [q for q in data.get("questions", []) if _valid_question(q)],
+    }
+
+def _generate_chunk(chunk: str, index: int, total: int, n_questions: int,
+                    deadline: float | None = None) -> tuple[dict, int]:
+    response = _llm().generate(CHUNK_SYSTEM_PROMPT, _build_chunk_prompt(chunk, index, total, n_questions),
+                               CHUNK_OUTPUT_TOKENS, deadline=deadline)
+    return _parse_chunk_response(response), response.tokens
+
+async def _generate_chunk_async(chunk: str, index: int, total: int, n_questions: int) -> tuple[dict, int]:
+    response = await _llm().agenerate(CHUNK_SYSTEM_PROMPT, _build_chunk_prompt(chunk, index, total, n_questions),
+                                      CHUNK_OUTPUT_TOKENS)
+    return _parse_chunk_response(response), response.tokens
+
+def _reduce_chunks(chunks: list[str], outcomes: dict, skipped: int, elapsed: float) -> ChunkedResult:
+    """outcomes: chunk index -> (parsed chunk or None, tokens, latency_s, error)."""
+    reports, candidates, summary, tokens = [], [], "", 0
+    for i in sorted(outcomes):
+        parsed, used, latency, error = outcomes[i]
+        tokens += used
+        questions = parsed["questions"] if parsed else []
+        reports.append(ChunkReport(i, len(chunks[i]), round(latency, 3), used, len(questions), error))
+        candidates.append(questions)
+        if parsed and not summary:
+            summary = parsed["summary"]
+    result = ChunkedResult(
+        {"title": "Gemini 10-Question Quiz", "summary": summary, "questions": select_questions(candidates)},
+        reports, skipped, tokens, elapsed,
+    )
+    logger.info("chunked generation %s", json.dumps(result.report()))
+    if not result.quiz["questions"]:
+        errors = "; ".join(r.error for r in reports if r.error)
+        raise RuntimeError(f"Chunked generation produced no usable questions ({errors or 'empty chunks'})")
+    return result
+
+def _single_chunk_result(article_text: str, quiz: dict, tokens: int, elapsed: float) -> ChunkedResult:
+    report = ChunkReport(0, len(article_text), round(elapsed, 3), tokens, len(quiz["questions"]), None)
+    return ChunkedResult(quiz, [report], 0, tokens, elapsed)
+
+def generate_quiz_chunked(article_text: str) -> ChunkedResult:
+    """
+    Map-reduce generation for long articles: candidate questions per chunk, at most
+    CHUNK_CONCURRENCY calls at once and within CHUNK_TOKEN_BUDGET / CHUNK_TIMEOUT,
+    then select_questions. Text that fits one chunk takes the single-call path.
+    """
+    start = time.perf_counter()
+    chunks = split_chunks(article_text)
+    if len(chunks) <= 1:
+        quiz, tokens = _generate_single(article_text)
+        return _single_chunk_result(article_text, quiz, tokens, time.perf_counter() - start)
+
+    selected = plan_chunks(chunks)
+    n_questions = questions_per_chunk(len(selected))
+    # threads can't be cancelled: calls still running at the timeout stop retrying instead
+    deadline = time.monotonic() + CHUNK_TIMEOUT
+
+    def run(i: int):
+        t = time.perf_counter()
+        try:
+            parsed, used = _generate_chunk(chunks[i], i, len(chunks), n_questions, deadline)
+            return parsed, used, time.perf_counter() - t, None
+        except Exception as e:
+            return None, 0, time.perf_counter() - t, str(e)
+
+    pool = ThreadPoolExecutor(max_workers=max(1, CHUNK_CONCURRENCY))
+    futures = {pool.submit(run, i): i for i in selected}
+    done, _ = wait(futures, timeout=CHUNK_TIMEOUT)
+    # don't wait for stragglers; their results are discarded and, past the deadline,
+    # they start no further attempts
+    pool.shutdown(wait=False, cancel_futures=True)
+    outcomes = {
+        i: f.result() if f in done else (None, 0, CHUNK_TIMEOUT, "timed out")
+        for f, i in futures.items()
+    }
+    return _reduce_chunks(chunks, outcomes, len(chunks) - len(selected), time.perf_counter() - start)
+
+async def generate_quiz_chunked_async(article_text: str) -> ChunkedResult:
+    """Async variant of generate_quiz_chunked (a semaphore instead of a thread pool)."""
+    start = time.perf_counter()
+    chunks = split_chunks(article_text)
+    if len(chunks) <= 1:
+        quiz, tokens = await _generate_single_async(article_text)
+        return _single_chunk_result(article_text, quiz, tokens, time.perf_counter() - start)
+
+    selected = plan_chunks(chunks)
+    n_questions = questions_per_chunk(len(selected))
+    sem = asyncio.Semaphore(max(1, CHUNK_CONCURRENCY))
+
+    async def run(i: int):
+        async with sem:
+            t = time.perf_counter()
+            try:
+                parsed, used = await _generate_chunk_async(chunks[i], i, len(chunks), n_questions)
+                return parsed, used, time.perf_counter() - t, None
+            except Exception as e:
+                return None, 0, time.perf_counter() - t, str(e)
+
+    tasks = {asyncio.ensure_future(run(i)): i for i in selected}
+    done, pending = await asyncio.wait(tasks, timeout=CHUNK_TIMEOUT)
+    for task in pending:
+        task.cancel()
+    outcomes = {
+        i: t.result() if t in done else (None, 0, CHUNK_TIMEOUT, "timed out")
+        for t, i in tasks.items()
+    }
+    return _reduce_chunks(chunks, outcomes, len(chunks) - len(selected), time.perf_counter() - start)
+
 # Example Usage
 if __name__ == "__main__":
     sample_text = "Mount Everest is Earth's highest mountain..."
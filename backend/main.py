@@ -1,20 +1,47 @@
 # backend/main.py
-import json
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import List
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 
-from .database import SessionLocal, create_tables, Quiz
-from .scraper import scrape_wikipedia
-from .llm_quiz_generator import generate_quiz
+from .database import SessionLocal, create_tables, pool_status
+from .cache import quiz_cache
+from .singleflight import generate_flight
+from .jobs import job_queue
+from .batch import run_batch, BATCH_MAX_URLS
+from .history import (
+    HISTORY_DEFAULT_LIMIT,
+    HISTORY_MAX_LIMIT,
+    HISTORY_STREAM_THRESHOLD,
+    history_filters,
+    cursor_exists,
+    fetch_page,
+    next_cursor_for,
+    stream_page,
+)
+from .fetcher import html_cache
+from .llm_providers import get_llm
+from .llm_quiz_generator import MODEL_ID
+from .blobs import quiz_with_payload, response_bytes
+from .pipeline import run_generation, quiz_response, ScrapeError, GenerationError
+from .metrics import registry, MetricFamily, InstrumentationMiddleware, timed
 
 # Ensure tables exist
 create_tables()
 
-app = FastAPI(title="AI Wiki Quiz Generator")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # start job workers and pick up jobs left unfinished by a previous run
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+
+app = FastAPI(title="AI Wiki Quiz Generator", lifespan=lifespan)
 
 # Allow local frontend during development
 app.add_middleware(
@@ -30,8 +57,54 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
 
+# per-stage timings, Server-Timing header, request metrics, opt-in profiling
+app.add_middleware(InstrumentationMiddleware)
+
+# ---------- /metrics collectors ---------- #
+LLM_COUNTERS = ("calls", "attempts", "errors", "retries", "retries_denied", "rate_limited_responses", "timeouts", "abandoned")
+
+def _app_metrics() -> list[MetricFamily]:
+    llm = get_llm(MODEL_ID).snapshot()
+    pools = pool_status()
+    cache = quiz_cache.snapshot()
+    flight = generate_flight.snapshot()
+    html = html_cache.snapshot()
+    return [
+        MetricFamily("quiz_db_pool_connections", "gauge", "DB pool connections by engine: configured size, checked out, idle, overflow.", [
+            ("", {"engine": engine, "state": state}, value)
+            for engine, status in pools.items()
+            for state, value in status.items()
+        ]),
+        MetricFamily("quiz_llm_tokens_total", "counter", "LLM tokens used.", [
+            ("", {"direction": "input"}, llm["input_tokens"]),
+            ("", {"direction": "output"}, llm["output_tokens"]),
+        ]),
+        MetricFamily("quiz_llm_events_total", "counter", "LLM calls, attempts, errors and retries.", [
+            ("", {"event": k}, llm[k]) for k in LLM_COUNTERS
+        ]),
+        MetricFamily("quiz_llm_throttle_wait_seconds_total", "counter", "Time spent waiting on LLM rate limits.", [
+            ("", {}, llm["throttle_wait_s"]),
+        ]),
+        MetricFamily("quiz_llm_in_flight", "gauge", "LLM calls in progress.", [("", {}, llm["in_flight"])]),
+        MetricFamily("quiz_cache_events_total", "counter", "In-process quiz cache events.", [
+            ("", {"event": k}, cache[k]) for k in quiz_cache.stats
+        ]),
+        MetricFamily("quiz_cache_entries", "gauge", "Entries in the in-process quiz cache.", [("", {}, cache["size"])]),
+        MetricFamily("quiz_singleflight_total", "counter", "Generations started vs. coalesced onto one in flight.", [
+            ("", {"role": "leader"}, flight["leaders"]),
+            ("", {"role": "coalesced"}, flight["coalesced"]),
+        ]),
+        MetricFamily("quiz_html_cache_events_total", "counter", "HTML disk cache events.", [
+            ("", {"event": k}, html[k]) for k in html_cache.stats
+        ]),
+        MetricFamily("quiz_job_queue_depth", "gauge", "Jobs waiting for a worker.", [("", {}, job_queue.size())]),
+    ]
+
+registry.add_collector(_app_metrics)
+
 # ---------- Pydantic schemas ---------- #
 class QuestionSchema(BaseModel):
     question: str
@@ -45,10 +118,37 @@ class QuizOutputSchema(BaseModel):
     date_generated: datetime
     summary: str | None
     questions: List[QuestionSchema]
+    cached: bool = False
+    cache_source: str | None = None  # "memory" or "db" on a hit
 
 class GenerateRequest(BaseModel):
     url: str
 
+class BatchRequest(BaseModel):
+    urls: List[str]
+
+class BatchItem(BaseModel):
+    url: str
+    status: str  # ok/error
+    quiz_id: int | None
+    cached: bool
+    error: str | None
+
+class BatchResponse(BaseModel):
+    items: List[BatchItem]
+    stats: dict
+
+class JobSchema(BaseModel):
+    id: str
+    url: str
+    priority: int
+    status: str
+    stage: str | None
+    quiz_id: int | None
+    error: str | None
+    created_at: datetime
+    updated_at: datetime
+
 class HistoryItem(BaseModel):
     id: int
     url: str
@@ -65,71 +165,100 @@ def get_db():
 
 # ---------- Endpoints ---------- #
 @app.post("/generate_quiz", response_model=QuizOutputSchema)
-def generate_quiz_endpoint(req: GenerateRequest, db=Depends(get_db)):
-    # 1) scrape the article
-    try:
-        title, article_text = scrape_wikipedia(req.url)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Scraping failed: {e}")
+async def generate_quiz_endpoint(
+    req: GenerateRequest,
+    async_mode: bool = Query(False, alias="async"),
+    priority: int = 0,
+):
+    if async_mode:
+        # job mode: return immediately, poll /jobs/{id} or stream /jobs/{id}/events
+        job = await job_queue.submit(req.url, priority)
+        return JSONResponse(status_code=202, content=jsonable_encoder(job))
 
-    # 2) generate quiz via LLM
     try:
-        quiz_json = generate_quiz(article_text)
-    except Exception as e:
+        return await run_generation(req.url)
+    except ScrapeError as e:
+        raise HTTPException(status_code=400, detail=f"Scraping failed: {e}")
+    except GenerationError as e:
         raise HTTPException(status_code=500, detail=f"LLM generation failed: {e}")
 
-    # 3) save to DB
-    full_quiz_text = json.dumps(quiz_json, ensure_ascii=False)
-    db_title = title or quiz_json.get("title")
+@app.post("/generate_quiz/batch", response_model=BatchResponse)
+async def generate_quiz_batch_endpoint(req: BatchRequest):
+    if not req.urls:
+        raise HTTPException(status_code=400, detail="No URLs given")
+    if len(req.urls) > BATCH_MAX_URLS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_URLS} URLs per batch")
+    return await run_batch(req.urls)
 
-    q = Quiz(
-        url=req.url,
-        title=db_title,
-        scraped_content=article_text,
-        full_quiz_data=full_quiz_text,
+@app.get("/jobs/{job_id}", response_model=JobSchema)
+async def get_job(job_id: str):
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    if not await job_queue.get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(
+        job_queue.events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
     )
-    db.add(q)
-    db.commit()
-    db.refresh(q)
 
+@app.get("/cache/stats")
+def cache_stats():
     return {
-        "id": q.id,
-        "url": q.url,
-        "title": q.title,
-        "date_generated": q.date_generated,
-        "summary": quiz_json.get("summary"),
-        "questions": quiz_json.get("questions", []),
+        **quiz_cache.snapshot(),
+        "singleflight": generate_flight.snapshot(),
+        "html_cache": html_cache.snapshot(),
     }
 
+@app.get("/llm/stats")
+def llm_stats():
+    return get_llm(MODEL_ID).snapshot()
+
+@app.get("/metrics")
+def metrics():
+    # Prometheus text exposition format
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/history", response_model=List[HistoryItem])
-def history(db=Depends(get_db)):
-    rows = db.query(Quiz).order_by(Quiz.date_generated.desc()).all()
-    return [
-        {
-            "id": r.id,
-            "url": r.url,
-            "title": r.title,
-            "date_generated": r.date_generated,
-        }
-        for r in rows
-    ]
+def history(
+    response: Response,
+    limit: int = Query(HISTORY_DEFAULT_LIMIT, ge=1, le=HISTORY_MAX_LIMIT),
+    cursor: int | None = None,
+    url_prefix: str | None = None,
+    title_prefix: str | None = None,
+    db=Depends(get_db),
+):
+    # newest first; pass X-Next-Cursor back as ?cursor= for the next page
+    if cursor is not None and not cursor_exists(db, cursor):
+        raise HTTPException(status_code=400, detail="Unknown cursor")
+    filters = history_filters(cursor, url_prefix, title_prefix)
+
+    if limit > HISTORY_STREAM_THRESHOLD:
+        next_cursor = next_cursor_for(db, limit, filters)
+        headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else {}
+        return StreamingResponse(stream_page(limit, filters), media_type="application/json", headers=headers)
+
+    rows, next_cursor = fetch_page(db, limit, filters)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return rows
 
 @app.get("/quiz/{quiz_id}", response_model=QuizOutputSchema)
 def get_quiz(quiz_id: int, db=Depends(get_db)):
-    r = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    # stored pre-serialized: only the quiz payload is read, never parsed
+    r = quiz_with_payload(db, quiz_id)
     if not r:
         raise HTTPException(status_code=404, detail="Quiz not found")
 
     try:
-        quiz_data = json.loads(r.full_quiz_data)
-    except Exception:
-        quiz_data = {"summary": None, "questions": []}
+        with timed("serialize"):
+            body = response_bytes(r, r.data_z)
+    except ValueError:
+        return quiz_response(r, {"summary": None, "questions": []})
 
-    return {
-        "id": r.id,
-        "url": r.url,
-        "title": r.title,
-        "date_generated": r.date_generated,
-        "summary": quiz_data.get("summary"),
-        "questions": quiz_data.get("questions", []),
-    }
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,281 @@
+# backend/metrics.py
+"""
+Request and stage instrumentation.
+
+- `timed("scrape")` around a pipeline stage records its wall time into the
+  quiz_stage_duration_seconds histogram and into the current request's timings
+  (a stage that runs several times in one request, as in a batch, is summed).
+- InstrumentationMiddleware gives each HTTP request its timings, counts and times
+  the request per route, adds a `Server-Timing` header (per-stage durations, visible
+  in browser devtools) and optionally logs one JSON line per request.
+- `registry.render()` is the Prometheus text exposition served by /metrics; values
+  owned by other modules (DB pool, LLM tokens, caches) come from collectors.
+- `add_stage_observer(fn)` also hands every stage timing to fn (the load test's
+  per-stage report reads them this way, so all three use the same stage names).
+- Requests can be profiled with the sampling profiler (see profiler.py).
+
+Settings (env):
+  QUIZ_METRICS=0             disable timers, request metrics and the middleware
+  QUIZ_SERVER_TIMING=0       do not send Server-Timing headers
+  QUIZ_TIMING_LOG=1          log a JSON timing record per request (logger backend.metrics)
+  QUIZ_TIMING_LOG_MIN_MS     only log requests at least this slow (default 0)
+"""
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from contextvars import ContextVar
+from typing import Callable, NamedTuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+
+from . import profiler
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("QUIZ_METRICS", "1") == "1"
+SERVER_TIMING = os.getenv("QUIZ_SERVER_TIMING", "1") == "1"
+TIMING_LOG = os.getenv("QUIZ_TIMING_LOG", "0") == "1"
+TIMING_LOG_MIN_MS = float(os.getenv("QUIZ_TIMING_LOG_MIN_MS", "0"))
+
+# seconds; spans a cache hit (~1ms) to a slow LLM call
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# ---------- metric types ---------- #
+class MetricFamily(NamedTuple):
+    name: str
+    kind: str  # counter / gauge / histogram
+    help: str
+    samples: list  # (suffix, labels dict, value)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._lock = threading.Lock()
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def collect(self) -> MetricFamily:
+        with self._lock:
+            items = list(self._values.items())
+        return MetricFamily(self.name, "counter", self.help,
+                            [("", dict(zip(self.labels, k)), v) for k, v in sorted(items)])
+
+
+class Gauge:
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self.value = 0
+
+    def add(self, delta: float):
+        self.value += delta  # only touched from the event loop
+
+    def collect(self) -> MetricFamily:
+        return MetricFamily(self.name, "gauge", self.help, [("", {}, self.value)])
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series: dict[tuple, list] = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *label_values):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def collect(self) -> MetricFamily:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        samples = []
+        for key, series in sorted(items):
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += n
+                samples.append(("_bucket", {**labels, "le": _format_value(float(bound))}, cumulative))
+            samples.append(("_sum", labels, series[-1]))
+            samples.append(("_count", labels, cumulative))
+        return MetricFamily(self.name, "histogram", self.help, samples)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors: list[Callable[[], list[MetricFamily]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, fn: Callable[[], list[MetricFamily]]):
+        """fn() -> [MetricFamily, ...], called on every scrape."""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        families = [m.collect() for m in self._metrics]
+        for fn in self._collectors:
+            try:
+                families.extend(fn())
+            except Exception:
+                logger.exception("metrics collector %r failed", fn)
+        lines = []
+        for f in families:
+            lines.append(f"# HELP {f.name} {f.help}")
+            lines.append(f"# TYPE {f.name} {f.kind}")
+            for suffix, labels, value in f.samples:
+                lines.append(f"{f.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_seconds = registry.register(Histogram(
+    "quiz_stage_duration_seconds", "Wall time of pipeline stages (scrape, parse, generate, persist, ...).", ("stage",)))
+request_seconds = registry.register(Histogram(
+    "quiz_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")))
+requests_total = registry.register(Counter(
+    "quiz_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")))
+requests_in_flight = registry.register(Gauge(
+    "quiz_http_requests_in_flight", "HTTP requests currently being served."))
+
+# ---------- stage timers ---------- #
+# stage -> seconds for the request being served (None outside a request); shared by
+# reference with threadpool work and tasks started from the request
+_request_timings: ContextVar[dict | None] = ContextVar("quiz_request_timings", default=None)
+_stage_observers: list[Callable[[str, float], None]] = []
+
+
+def add_stage_observer(fn: Callable[[str, float], None]):
+    """fn(stage, seconds), called for every recorded stage (from any thread)."""
+    _stage_observers.append(fn)
+
+
+def record_stage(stage: str, seconds: float):
+    if not METRICS_ENABLED:
+        return
+    stage_seconds.observe(seconds, stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+    for fn in _stage_observers:
+        fn(stage, seconds)
+
+
+class timed:
+    """Context manager timing one stage: `with timed("parse"): ...` (also around awaits)."""
+
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record_stage(self.stage, time.perf_counter() - self.start)
+
+
+def server_timing(timings: dict, total: float) -> str:
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# ---------- middleware ---------- #
+def _route_label(scope) -> str:
+    # the route template, not the raw path, to bound label cardinality
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class InstrumentationMiddleware:
+    """Pure ASGI middleware (streaming responses pass through untouched)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        profile = profiler.start_for(scope)
+        if not METRICS_ENABLED and profile is None:
+            return await self.app(scope, receive, send)
+
+        timings: dict = {}
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                if METRICS_ENABLED and SERVER_TIMING:
+                    headers.append("Server-Timing", server_timing(timings, time.perf_counter() - start))
+                if profile is not None:
+                    headers.append("X-Profile", profile.name)
+            await send(message)
+
+        requests_in_flight.add(1)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            requests_in_flight.add(-1)
+            _request_timings.reset(token)
+            if profile is not None:
+                await run_in_threadpool(profile.finish)
+            if METRICS_ENABLED:
+                self._record(scope, status, elapsed, timings)
+
+    @staticmethod
+    def _record(scope, status: int, elapsed: float, timings: dict):
+        method, route = scope["method"], _route_label(scope)
+        request_seconds.observe(elapsed, method, route)
+        requests_total.inc(method, route, str(status))
+        if TIMING_LOG and elapsed * 1000 >= TIMING_LOG_MIN_MS:
+            record = {
+                "event": "request_timing",
+                "method": method,
+                "route": route,
+                "path": scope["path"],
+                "status": status,
+                "total_ms": round(elapsed * 1000, 2),
+                "stages_ms": {k: round(v * 1000, 2) for k, v in timings.items()},
+            }
+            logger.info(json.dumps(record), extra={"timing": record})
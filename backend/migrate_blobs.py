@@ -0,0 +1,159 @@
+# backend/migrate_blobs.py
+"""
+One-off migration from the old quizzes layout (scraped_content / full_quiz_data as
+plain Text on every row) to compressed, deduplicated storage (see blobs.py):
+
+    python -m backend.migrate_blobs [--dry-run] [--keep-legacy-columns]
+
+Article text is stored once per content hash in `articles`, quiz JSON goes to
+`quiz_payloads`, and the legacy columns are dropped. Safe to re-run: quizzes that
+already have a payload are skipped. Prints a JSON report of the bytes saved.
+"""
+import os
+import sys
+import json
+import argparse
+
+from sqlalchemy import text, select
+
+from .database import (
+    engine,
+    inspect,
+    SessionLocal,
+    QuizPayload,
+    Article,
+    create_tables,
+    add_missing_quiz_columns,
+    legacy_quiz_columns,
+)
+from .blobs import compress, payload_json, store_article
+from .cache import content_hash
+
+MIGRATE_CHUNK_ROWS = 1000
+
+
+def _sqlite_file() -> str | None:
+    if engine.dialect.name != "sqlite":
+        return None
+    path = engine.url.database
+    return path if path and path != ":memory:" and os.path.exists(path) else None
+
+
+def _load_quiz_json(raw: str | None) -> dict:
+    try:
+        data = json.loads(raw) if raw else {}
+    except ValueError:
+        data = {}
+    return data if isinstance(data, dict) else {}
+
+
+def migrate(dry_run: bool = False, drop_legacy: bool = True, chunk: int = MIGRATE_CHUNK_ROWS) -> dict:
+    legacy = legacy_quiz_columns()
+    report = {
+        "legacy_columns": legacy,
+        "rows": 0,
+        "skipped": 0,
+        "articles_stored": 0,
+        "articles_deduplicated": 0,
+        "legacy_bytes": 0,
+        "compressed_bytes": 0,
+    }
+    if "full_quiz_data" not in legacy:
+        report["note"] = "nothing to migrate"
+        return report
+
+    db_file = _sqlite_file()
+    size_before = os.path.getsize(db_file) if db_file else None
+    if not dry_run:
+        # databases from before the quiz cache lack content_hash & co.
+        report["added_columns"] = add_missing_quiz_columns()
+        create_tables(allow_legacy=True)
+
+    text_col = "scraped_content" if "scraped_content" in legacy else "NULL"
+    present = {c["name"] for c in inspect(engine).get_columns("quizzes")}
+    hash_col = "content_hash" if "content_hash" in present else "NULL"
+    page = text(
+        f"SELECT id, {hash_col} AS content_hash, {text_col} AS scraped_content, full_quiz_data "
+        "FROM quizzes WHERE id > :last ORDER BY id LIMIT :n"
+    )
+    seen_hashes: set[str] = set()
+    db = SessionLocal()
+    try:
+        last = 0
+        while True:
+            rows = db.execute(page, {"last": last, "n": chunk}).all()
+            if not rows:
+                break
+            last = rows[-1].id
+            ids = [r.id for r in rows]
+            done = set() if dry_run else set(
+                db.execute(select(QuizPayload.quiz_id).where(QuizPayload.quiz_id.in_(ids))).scalars()
+            )
+            for r in rows:
+                if r.id in done:
+                    report["skipped"] += 1
+                    continue
+                report["rows"] += 1
+                quiz_raw = r.full_quiz_data or ""
+                report["legacy_bytes"] += len(quiz_raw.encode("utf-8"))
+                payload = compress(payload_json(_load_quiz_json(quiz_raw)))
+                report["compressed_bytes"] += len(payload)
+                if not dry_run:
+                    db.add(QuizPayload(quiz_id=r.id, data_z=payload))
+
+                if not r.scraped_content:
+                    continue
+                report["legacy_bytes"] += len(r.scraped_content.encode("utf-8"))
+                h = r.content_hash or content_hash(r.scraped_content)
+                if not dry_run and r.content_hash is None:
+                    db.execute(text("UPDATE quizzes SET content_hash = :h WHERE id = :id"), {"h": h, "id": r.id})
+                stored = h in seen_hashes or (
+                    not dry_run and db.get(Article, h) is not None
+                )
+                if stored:
+                    report["articles_deduplicated"] += 1
+                    continue
+                seen_hashes.add(h)
+                report["articles_stored"] += 1
+                report["compressed_bytes"] += len(compress(r.scraped_content.encode("utf-8")))
+                if not dry_run:
+                    store_article(db, h, r.scraped_content)
+            if not dry_run:
+                db.commit()
+    finally:
+        db.close()
+
+    if not dry_run and drop_legacy:
+        with engine.begin() as conn:
+            for col in legacy:
+                conn.execute(text(f"ALTER TABLE quizzes DROP COLUMN {col}"))
+        report["dropped_columns"] = legacy
+        if db_file:
+            # SQLite keeps freed pages until the file is rebuilt
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text("VACUUM"))
+
+    report["bytes_saved"] = report["legacy_bytes"] - report["compressed_bytes"]
+    report["ratio"] = round(report["compressed_bytes"] / report["legacy_bytes"], 3) if report["legacy_bytes"] else None
+    if db_file:
+        report["db_file_bytes_before"] = size_before
+        report["db_file_bytes_after"] = os.path.getsize(db_file)
+    report["dry_run"] = dry_run
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Move quiz text/JSON blobs to compressed, deduplicated tables.")
+    parser.add_argument("--dry-run", action="store_true", help="only report the expected savings")
+    parser.add_argument("--keep-legacy-columns", action="store_true",
+                        help="copy the data but leave scraped_content/full_quiz_data in place "
+                             "(the app refuses to start until they are dropped)")
+    parser.add_argument("--chunk", type=int, default=MIGRATE_CHUNK_ROWS, help="rows per transaction")
+    args = parser.parse_args(argv)
+
+    report = migrate(dry_run=args.dry_run, drop_legacy=not args.keep_legacy_columns, chunk=args.chunk)
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+# backend/pipeline.py
+import os
+
+from starlette.concurrency import run_in_threadpool
+
+from .database import SessionLocal, get_async_sessionmaker, Quiz
+from .scraper import fetch_article, fetch_article_async, ScrapedArticle
+from .llm_quiz_generator import (
+    generate_quiz,
+    generate_quiz_async,
+    generate_quiz_batch,
+    generate_quiz_batch_async,
+    generate_quiz_chunked,
+    generate_quiz_chunked_async,
+    BatchResult,
+    CHUNKED_GENERATION,
+    PROMPT_VERSION,
+)
+from .blobs import add_quizzes, load_payload
+from .cache import quiz_cache, canonical_url, remember_redirect, content_hash, find_cached_quiz
+from .singleflight import generate_flight
+from .metrics import timed
+
+# QUIZ_ASYNC_PIPELINE=1 -> httpx + async Gemini client + AsyncSession.
+# Otherwise each blocking stage runs on the threadpool exactly as before.
+ASYNC_PIPELINE = os.getenv("QUIZ_ASYNC_PIPELINE", "0") == "1"
+
+
+class ScrapeError(RuntimeError):
+    pass
+
+
+class GenerationError(RuntimeError):
+    pass
+
+
+def quiz_response(q: Quiz, quiz_json: dict) -> dict:
+    return {
+        "id": q.id,
+        "url": q.url,
+        "title": q.title,
+        "date_generated": q.date_generated,
+        "summary": quiz_json.get("summary"),
+        "questions": quiz_json.get("questions", []),
+    }
+
+# ---------- DB steps (plain Session; reused by the async path via run_sync) ---------- #
+def lookup_cached_quiz(db, text_hash: str):
+    existing = find_cached_quiz(db, text_hash, PROMPT_VERSION)
+    if existing is None:
+        return None
+    q, blob = existing
+    try:
+        return quiz_response(q, load_payload(blob))
+    except ValueError:
+        return None
+
+def _save_quiz(db, fields: dict, article_text: str, quiz_json: dict) -> Quiz:
+    [q] = add_quizzes(db, [(fields, article_text, quiz_json)])
+    db.commit()
+    db.refresh(q)
+    return q
+
+def _with_session(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+async def run_db(fn, *args):
+    """Run fn(session, *args) on the sync or async engine depending on the pipeline mode."""
+    if ASYNC_PIPELINE:
+        async with get_async_sessionmaker()() as session:
+            return await session.run_sync(fn, *args)
+    return await run_in_threadpool(_with_session, fn, *args)
+
+# ---------- Stages ---------- #
+async def scrape_article(url: str) -> ScrapedArticle:
+    try:
+        if ASYNC_PIPELINE:
+            return await fetch_article_async(url)
+        return await run_in_threadpool(fetch_article, url)
+    except Exception as e:
+        raise ScrapeError(str(e)) from e
+
+async def _generate(article_text: str) -> dict:
+    try:
+        if CHUNKED_GENERATION:
+            # map-reduce over sections; per-chunk latency/tokens are logged by the generator
+            if ASYNC_PIPELINE:
+                return (await generate_quiz_chunked_async(article_text)).quiz
+            return (await run_in_threadpool(generate_quiz_chunked, article_text)).quiz
+        if ASYNC_PIPELINE:
+            return await generate_quiz_async(article_text)
+        return await run_in_threadpool(generate_quiz, article_text)
+    except Exception as e:
+        raise GenerationError(str(e)) from e
+
+async def generate_batch(article_texts: list[str]) -> BatchResult:
+    """One packed LLM call for several articles (per-article fallback inside)."""
+    if ASYNC_PIPELINE:
+        return await generate_quiz_batch_async(article_texts)
+    return await run_in_threadpool(generate_quiz_batch, article_texts)
+
+async def run_generation(url: str, on_stage=None) -> dict:
+    """
+    Scrape -> generate -> persist for one article URL, consulting the quiz cache first.
+    Concurrent calls for the same canonical URL share a single run (and quiz id).
+    on_stage: optional async callback receiving "scraping"/"generating"/"saving"
+    (only the caller that actually runs the work sees them).
+    Raises ScrapeError / GenerationError; the returned dict matches QuizOutputSchema.
+    """
+    key = canonical_url(url)
+
+    # 0) in-process cache: skips scraping and the LLM entirely
+    hit = quiz_cache.get((key, PROMPT_VERSION))
+    if hit is not None:
+        return {**hit, "cached": True, "cache_source": "memory"}
+
+    resp = await generate_flight.do((key, PROMPT_VERSION), lambda: _generate_uncached(url, key, on_stage))
+    return dict(resp)
+
+async def _noop_stage(stage: str):
+    pass
+
+async def _generate_uncached(url: str, key: str, on_stage=None) -> dict:
+    on_stage = on_stage or _noop_stage
+
+    # 1) scrape the article
+    await on_stage("scraping")
+    article = await scrape_article(url)
+    resolved = canonical_url(article.url)
+    remember_redirect(key, resolved)
+    cache_key = (resolved, PROMPT_VERSION)
+
+    # 1b) persistent cache: identical text + prompt version -> reuse stored quiz
+    text_hash = content_hash(article.text)
+    with timed("cache_lookup"):
+        resp = await run_db(lookup_cached_quiz, text_hash)
+    if resp is not None:
+        quiz_cache.record("db_hits")
+        quiz_cache.set(cache_key, resp)
+        return {**resp, "cached": True, "cache_source": "db"}
+
+    quiz_cache.record("misses")
+
+    # 2) generate quiz via LLM
+    await on_stage("generating")
+    with timed("generate"):
+        quiz_json = await _generate(article.text)
+
+    # 3) save to DB
+    await on_stage("saving")
+    with timed("persist"):
+        q = await run_db(_save_quiz, {
+            "url": url,
+            "canonical_url": resolved,
+            "title": article.title or quiz_json.get("title"),
+            "content_hash": text_hash,
+            "prompt_version": PROMPT_VERSION,
+        }, article.text, quiz_json)
+
+    resp = quiz_response(q, quiz_json)
+    quiz_cache.set(cache_key, resp)
+    return resp
@@ -0,0 +1,121 @@
+# backend/profiler.py
+"""
+Opt-in sampling profiler for single requests.
+
+While a profiled request runs, a background thread samples the Python stack of
+every thread each QUIZ_PROFILE_INTERVAL_MS and, when the request ends, writes
+them in collapsed-stack format ("thread;outer;...;inner <count>" per line) to
+QUIZ_PROFILE_DIR. Feed the file to flamegraph.pl, speedscope or inferno. Idle
+threads (waiting on a queue, lock or selector) are left out; threadpool work done
+for the request shows up under the worker threads.
+
+Samples cover the whole process, so on a busy instance other requests' work is in
+the profile too. Only one request is profiled at a time.
+
+Settings (env); nothing is sampled unless QUIZ_PROFILE_DIR is set:
+  QUIZ_PROFILE_DIR           where .folded files are written
+  QUIZ_PROFILE_HEADER        request header that asks for a profile (default X-Quiz-Profile)
+  QUIZ_PROFILE_TOKEN         if set, the header value must equal it
+  QUIZ_PROFILE_RATE          also profile this fraction of all requests (default 0)
+  QUIZ_PROFILE_INTERVAL_MS   sampling interval (default 5)
+"""
+import os
+import sys
+import time
+import hmac
+import uuid
+import random
+import threading
+from collections import Counter
+
+PROFILE_DIR = os.getenv("QUIZ_PROFILE_DIR", "")
+PROFILE_HEADER = os.getenv("QUIZ_PROFILE_HEADER", "X-Quiz-Profile").lower().encode("latin-1")
+PROFILE_TOKEN = os.getenv("QUIZ_PROFILE_TOKEN", "")
+PROFILE_RATE = float(os.getenv("QUIZ_PROFILE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("QUIZ_PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_MAX_DEPTH = 128
+
+# leaf frames of threads that are parked rather than working
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+
+_active = threading.Lock()  # held while a profile is being taken
+
+
+def _frame_label(code) -> str:
+    # ';' separates frames in the collapsed format (the count follows the last space)
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    return filename in _IDLE_FILES or (filename == "thread.py" and code.co_name == "_worker")
+
+
+def _stack(frame) -> tuple | None:
+    if _is_idle(frame):
+        return None
+    labels = []
+    while frame is not None and len(labels) < PROFILE_MAX_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+
+class SamplingProfiler:
+    """Samples all threads' stacks until finish(), then writes the collapsed stacks to path."""
+
+    def __init__(self, path: str, interval: float = PROFILE_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="quiz-profiler", daemon=True)
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = _stack(frame)
+                if stack is not None:
+                    self.samples[(names.get(ident, str(ident)),) + stack] += 1
+
+    def finish(self):
+        """Stop sampling and write the profile (blocking; run off the event loop)."""
+        self._stop.set()
+        self._thread.join()
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "w") as f:
+                for stack, count in sorted(self.samples.items()):
+                    f.write(f"{';'.join(stack)} {count}\n")
+        finally:
+            _active.release()
+
+
+def _requested(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return not PROFILE_TOKEN or hmac.compare_digest(value, PROFILE_TOKEN.encode("latin-1"))
+    return PROFILE_RATE > 0 and random.random() < PROFILE_RATE
+
+
+def start_for(scope) -> SamplingProfiler | None:
+    """Start a profile for this HTTP request if profiling is configured and asked for."""
+    if not PROFILE_DIR or not _requested(scope) or not _active.acquire(blocking=False):
+        return None
+    slug = scope["path"].strip("/").replace("/", "_")[:40] or "root"
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%dT%H%M%S')}-{slug}-{uuid.uuid4().hex[:8]}.folded")
+    return SamplingProfiler(path).start()
@@ -1,73 +1,92 @@
 # backend/scraper.py
-import requests
-from bs4 import BeautifulSoup, NavigableString, Tag
+from starlette.concurrency import run_in_threadpool
 import re
+from typing import NamedTuple
+from urllib.parse import urlsplit, urlunsplit, parse_qs
 
-HEADERS = {
-    "User-Agent": "ai-quiz-generator/1.0 (https://example.com) Python requests"
-}
-
-def _clean_paragraph(p: Tag) -> str:
-    """Return cleaned text from a <p> tag, stripping sup, reference links, and extra whitespace."""
-    # remove sup and reference anchors
-    for sup in p.find_all("sup"):
-        sup.decompose()
-    for a in p.find_all("a", class_="mw-selflink"):
-        a.unwrap()
-    text = p.get_text(separator=" ", strip=True)
-    # collapse multiple spaces/newlines
-    text = re.sub(r"\s+", " ", text)
-    return text
+from .extractors import extract_article
+from .fetcher import fetch_html, fetch_html_async
+from .metrics import timed
+
+_CANONICAL_LINK_RE = re.compile(r'<link\s+rel="canonical"\s+href="([^"]+)"', re.IGNORECASE)
+
+class ScrapedArticle(NamedTuple):
+    title: str
+    text: str
+    url: str  # where the article actually lives (after HTTP and wiki redirects)
+
+def _check_url(url: str):
+    if not url.startswith("http"):
+        raise ValueError("Please supply a full URL (including http/https).")
+
+def _is_wikipedia(host: str) -> bool:
+    return host == "wikipedia.org" or host.endswith(".wikipedia.org")
+
+def _same_site(url: str, other: str) -> bool:
+    """Same host, or both on Wikipedia (en.m.wikipedia.org -> en.wikipedia.org)."""
+    a, b = urlsplit(url).hostname or "", urlsplit(other).hostname or ""
+    return a == b or (_is_wikipedia(a) and _is_wikipedia(b))
+
+def _resolved_url(final_url: str, html: str) -> str:
+    # Wikipedia serves /wiki/USA with a 200 and points rel=canonical at /wiki/United_States.
+    # The canonical URL becomes a cache key, so a page may only claim one on its own site.
+    m = _CANONICAL_LINK_RE.search(html, 0, 20000)
+    if m and _same_site(final_url, m.group(1)):
+        return m.group(1)
+    return final_url
+
+def _pin_revision(requested: str, resolved: str) -> str:
+    """
+    Carry ?oldid= from the requested URL over to the resolved one: Wikipedia's
+    canonical link for an old revision (and the REST endpoint's page link) is the current
+    article, which must not be cached with the old revision's quiz.
+    """
+    oldid = parse_qs(urlsplit(requested).query).get("oldid")
+    parts = urlsplit(resolved)
+    if not oldid or "oldid" in parse_qs(parts.query):
+        return resolved
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, f"oldid={oldid[0]}", ""))
+
+def fetch_article(url: str, max_paragraphs: int = None) -> ScrapedArticle:
+    """Download and parse an article, also reporting its resolved URL."""
+    _check_url(url)
+
+    with timed("scrape"):
+        page = fetch_html(url)
+
+    with timed("parse"):
+        title, text = parse_article(page.html, max_paragraphs)
+    return ScrapedArticle(title, text, _pin_revision(url, _resolved_url(page.url, page.html)))
 
 def scrape_wikipedia(url: str, max_paragraphs: int = None) -> tuple[str, str]:
     """
     Scrape a Wikipedia article and return (title, cleaned_text).
     max_paragraphs: optionally limit number of paragraphs (helpful for very long pages).
     """
-    if not url.startswith("http"):
-        raise ValueError("Please supply a full URL (including http/https).")
+    article = fetch_article(url, max_paragraphs)
+    return article.title, article.text
+
+async def fetch_article_async(url: str, max_paragraphs: int = None) -> ScrapedArticle:
+    """
+    Async variant of fetch_article: the download does not hold a thread,
+    only the CPU-bound HTML parsing is pushed to the threadpool.
+    """
+    _check_url(url)
+
+    with timed("scrape"):
+        page = await fetch_html_async(url)
+
+    with timed("parse"):
+        title, text = await run_in_threadpool(parse_article, page.html, max_paragraphs)
+    return ScrapedArticle(title, text, _pin_revision(url, _resolved_url(page.url, page.html)))
+
+async def scrape_wikipedia_async(url: str, max_paragraphs: int = None) -> tuple[str, str]:
+    article = await fetch_article_async(url, max_paragraphs)
+    return article.title, article.text
 
-    resp = requests.get(url, headers=HEADERS, timeout=15)
-    resp.raise_for_status()
-
-    soup = BeautifulSoup(resp.text, "html.parser")
-
-    # Title
-    title_tag = soup.find("h1", id="firstHeading")
-    title = title_tag.get_text(strip=True) if title_tag else ""
-
-    # Main content block
-    content_div = soup.find(id="mw-content-text")
-    if not content_div:
-        # fallback: try article tag
-        content_div = soup.find("article")
-
-    if not content_div:
-        raise RuntimeError("Couldn't find main content on the page.")
-
-    # remove tables, infoboxes, navboxes, and other non-paragraph content
-    for selector in ["table", "style", "script", "noscript", "sup", ".reference", ".toc", ".thumb", ".infobox"]:
-        for node in content_div.select(selector):
-            node.decompose()
-
-    # collect paragraph texts
-    paragraphs = []
-    for p in content_div.find_all("p"):
-        cleaned = _clean_paragraph(p)
-        if cleaned:
-            paragraphs.append(cleaned)
-            if max_paragraphs and len(paragraphs) >= max_paragraphs:
-                break
-
-    # if no paragraphs found, try to collect text from divs
-    if not paragraphs:
-        texts = [t.get_text(separator=" ", strip=True) for t in content_div.find_all(["div", "span"])]
-        joined = " ".join([re.sub(r"\s+", " ", t) for t in texts if t])
-        return title, joined[:10000]  # limit length
-
-    full_text = "\n\n".join(paragraphs)
-    return title, full_text[:20000]  # return at most 20k chars (adjustable)
-    
+def parse_article(html: str, max_paragraphs: int = None) -> tuple[str, str]:
+    """Extract (title, cleaned_text) from a Wikipedia article page (see extractors.py)."""
+    return extract_article(html, max_paragraphs)
 
 if __name__ == "__main__":
     # quick local test: change this URL if you want a different article
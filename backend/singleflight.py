@@ -0,0 +1,40 @@
+# backend/singleflight.py
+import asyncio
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent async calls that share a key: the first caller starts the work,
+    later callers await the same task and receive the same result (or exception).
+
+    The work runs in its own task, so a caller disconnecting does not cancel it for
+    the others. Coalescing is per process/event loop.
+    """
+
+    def __init__(self):
+        self._inflight: dict = {}
+        self.stats = {"leaders": 0, "coalesced": 0}
+
+    async def do(self, key, fn):
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["leaders"] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # mark the exception retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "inflight": len(self._inflight)}
+
+
+generate_flight = SingleFlight()
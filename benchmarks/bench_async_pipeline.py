@@ -0,0 +1,85 @@
+# benchmarks/bench_async_pipeline.py
+"""
+Compare the sync (threadpool) and async generation pipelines under concurrent load.
+
+    python -m benchmarks.bench_async_pipeline --concurrency 50 100 250 500
+
+Runs fully offline: articles come from a local stub server and the LLM is the
+fake provider with a fixed latency. While each burst of POST /generate_quiz is
+in flight a single GET /history is timed, to show whether reads queue behind
+generations.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from .common import use_temp_sqlite, StubArticleServer, use_fake_llm, percentile
+
+use_temp_sqlite()
+
+import httpx  # noqa: E402
+
+from backend import pipeline  # noqa: E402
+from backend.main import app  # noqa: E402
+
+
+async def _burst(client: httpx.AsyncClient, base_url: str, n: int, tag: str) -> dict:
+    latencies = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        start = time.perf_counter()
+        r = await client.post("/generate_quiz", json={"url": f"{base_url}/wiki/{tag}_{i}"})
+        latencies.append(time.perf_counter() - start)
+        if r.status_code != 200:
+            errors += 1
+
+    async def probe_history():
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        await client.get("/history")
+        return time.perf_counter() - start
+
+    wall_start = time.perf_counter()
+    results = await asyncio.gather(probe_history(), *(one(i) for i in range(n)))
+    wall = time.perf_counter() - wall_start
+
+    return {
+        "requests": n,
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(n / wall, 1),
+        "p50_s": round(percentile(latencies, 50), 3),
+        "p95_s": round(percentile(latencies, 95), 3),
+        "p99_s": round(percentile(latencies, 99), 3),
+        "history_during_load_s": round(results[0], 3),
+    }
+
+
+async def main(args):
+    use_fake_llm(latency=args.llm_latency)
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    with StubArticleServer(latency=args.scrape_latency) as stub:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for concurrency in args.concurrency:
+                for mode in ("sync", "async"):
+                    pipeline.ASYNC_PIPELINE = mode == "async"
+                    row = await _burst(client, stub.base_url, concurrency, f"{mode}{concurrency}")
+                    row.update({"mode": mode, "concurrency": concurrency})
+                    results.append(row)
+                    print(json.dumps(row))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 100, 250, 500])
+    parser.add_argument("--scrape-latency", type=float, default=0.1, help="stub server delay per page (s)")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="fake LLM delay per call (s)")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,84 @@
+# benchmarks/bench_chunked.py
+"""
+Single-prompt versus chunked (map-reduce) quiz generation on long articles.
+
+    python -m benchmarks.bench_chunked [--latency 0.4] [--per-question 0.08] [--concurrency 4]
+
+Runs offline on the benchmark fixtures (see fixtures.py) with the extractor's text
+cap raised. The LLM is the fake provider, whose questions quote sentences from the
+text it was sent and whose latency grows with the number of questions returned,
+like real decoding. Coverage is the number of tenths of the article (by position)
+that at least one final question comes from.
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+
+os.environ.setdefault("QUIZ_LLM_PROVIDER", "fake")
+os.environ.setdefault("QUIZ_MAX_TEXT_CHARS", "100000")
+
+from backend import llm_quiz_generator as llm  # noqa: E402
+from backend.extractors import extract_article  # noqa: E402
+
+from .common import use_fake_llm  # noqa: E402
+from .fixtures import load_fixtures  # noqa: E402
+
+
+def _coverage(text: str, quiz: dict) -> int:
+    tenths = set()
+    for q in quiz["questions"]:
+        pos = text.find(q["answer"])
+        if pos >= 0:
+            tenths.add(min(9, pos * 10 // len(text)))
+    return len(tenths)
+
+
+def run(args) -> list[dict]:
+    llm.CHUNK_CONCURRENCY = args.concurrency
+    results = []
+    for name, html in load_fixtures():
+        _, text = extract_article(html)
+        cases = [
+            ("single", lambda: (llm.generate_quiz(text), None)),
+            ("chunked", lambda: (lambda r: (r.quiz, r))(llm.generate_quiz_chunked(text))),
+            ("chunked_async", lambda: (lambda r: (r.quiz, r))(asyncio.run(llm.generate_quiz_chunked_async(text)))),
+        ]
+        for mode, fn in cases:
+            fake = use_fake_llm(args.latency, args.per_question)
+            start = time.perf_counter()
+            quiz, result = fn()
+            elapsed = time.perf_counter() - start
+            row = {
+                "fixture": name,
+                "text_chars": len(text),
+                "mode": mode,
+                "wall_s": round(elapsed, 3),
+                "llm_calls": fake.snapshot()["calls"],
+                "questions": len(quiz["questions"]),
+                "coverage_tenths": _coverage(text, quiz),
+            }
+            if result is not None:
+                row["tokens"] = result.tokens
+                row["skipped_chunks"] = result.skipped_chunks
+                row["chunks"] = [
+                    {"index": c.index, "latency_s": c.latency_s, "tokens": c.tokens, "candidates": c.candidates}
+                    for c in result.chunks
+                ]
+            print(json.dumps(row))
+            results.append(row)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.4, help="fake per-call base latency (s)")
+    parser.add_argument("--per-question", type=float, default=0.08, help="fake latency per generated question (s)")
+    parser.add_argument("--concurrency", type=int, default=llm.CHUNK_CONCURRENCY)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+    out = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(out, f, indent=2)
@@ -0,0 +1,100 @@
+# benchmarks/bench_extractors.py
+"""
+Throughput and peak memory of each HTML extractor backend over the fixture corpus,
+plus an equivalence check that every backend returns exactly what extract_bs4 does.
+
+    python -m benchmarks.bench_extractors [--repeat 20] [--output results.json]
+    python -m benchmarks.bench_extractors --check   # equivalence only; exit 1 on mismatch
+
+Peak memory is the growth in max RSS while extracting, measured in a fresh
+subprocess per (backend, fixture) so backends do not share a high-water mark.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from backend.extractors import EXTRACTORS, extract_bs4
+
+from .common import peak_rss_kb
+from .fixtures import load_fixtures
+
+# None = default budget (20k chars); small values exercise the early stop
+MAX_PARAGRAPH_CASES = (None, 1, 5, 50)
+
+
+def check_equivalence(fixtures) -> list[str]:
+    failures = []
+    for name, html in fixtures:
+        for max_paragraphs in MAX_PARAGRAPH_CASES:
+            expected = extract_bs4(html, max_paragraphs)
+            for backend, fn in EXTRACTORS.items():
+                if fn(html, max_paragraphs) != expected:
+                    failures.append(f"{backend} differs from bs4 on {name} (max_paragraphs={max_paragraphs})")
+    return failures
+
+
+def _peak_rss_kb(backend: str, index: int) -> int:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_extractors", "--measure-one", backend, str(index)],
+        check=True, capture_output=True, text=True,
+    )
+    return int(out.stdout.strip())
+
+
+def _measure_one(backend: str, index: int):
+    _, html = load_fixtures()[index]
+    before = peak_rss_kb()
+    EXTRACTORS[backend](html)
+    print(peak_rss_kb() - before)
+
+
+def main(args):
+    fixtures = load_fixtures()
+
+    failures = check_equivalence(fixtures)
+    for f in failures:
+        print("MISMATCH:", f, file=sys.stderr)
+    if args.check:
+        print("equivalent" if not failures else f"{len(failures)} mismatches")
+        return 1 if failures else 0
+
+    results = []
+    for index, (name, html) in enumerate(fixtures):
+        size_mb = len(html.encode("utf-8")) / 1e6
+        for backend, fn in EXTRACTORS.items():
+            fn(html)  # warm up
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                fn(html)
+            per_page = (time.perf_counter() - start) / args.repeat
+            row = {
+                "fixture": name,
+                "backend": backend,
+                "html_bytes": len(html.encode("utf-8")),
+                "ms_per_page": round(per_page * 1000, 2),
+                "pages_per_s": round(1 / per_page, 1),
+                "mb_per_s": round(size_mb / per_page, 2),
+                "peak_rss_growth_kb": _peak_rss_kb(backend, index),
+            }
+            results.append(row)
+            print(json.dumps(row))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results, "mismatches": failures}, f, indent=2)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--check", action="store_true", help="only verify identical output")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--measure-one", nargs=2, metavar=("BACKEND", "INDEX"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure_one:
+        _measure_one(args.measure_one[0], int(args.measure_one[1]))
+    else:
+        sys.exit(main(args))
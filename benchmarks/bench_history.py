@@ -0,0 +1,148 @@
+# benchmarks/bench_history.py
+"""
+/history against a populated SQLite table: the old load-everything query versus
+keyset pages (first, deep, streamed) and prefix filtering.
+
+    python -m benchmarks.bench_history --sizes 10000 100000 1000000
+
+Each size runs in its own process on a fresh database. Every quiz gets a stored
+payload with a --blob-chars summary, as in production, so the table carries
+realistic blob weight. Peak memory is tracemalloc's peak for
+Python allocations during the request.
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+
+def _populate(n: int, blob_chars: int):
+    from sqlalchemy import insert
+
+    from backend.blobs import compress
+    from backend.database import engine, Quiz, QuizPayload
+
+    rng = random.Random(0)
+    # random letters so the stored payload does not compress away to nothing
+    summary = "".join(rng.choice("abcdefghij ") for _ in range(blob_chars))
+    quiz_blob = compress(json.dumps({"summary": summary, "questions": [{"question": "q" * 80}] * 10}).encode())
+    start = datetime(2020, 1, 1)
+    chunk = 10000
+    with engine.begin() as conn:
+        for offset in range(0, n, chunk):
+            conn.execute(insert(Quiz), [
+                {
+                    "url": f"https://en.wikipedia.org/wiki/{rng.choice('ABCDEFGHIJ')}rticle_{i}",
+                    "title": f"{rng.choice('ABCDEFGHIJ')}rticle {i}",
+                    "date_generated": start + timedelta(seconds=i * 7),
+                }
+                for i in range(offset, min(n, offset + chunk))
+            ])
+            conn.execute(insert(QuizPayload), [
+                {"quiz_id": i + 1, "data_z": quiz_blob}
+                for i in range(offset, min(n, offset + chunk))
+            ])
+
+
+def _measure(fn) -> dict:
+    # timed without tracemalloc (it slows allocation-heavy code), then measured with it
+    t = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - t
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": round(elapsed * 1000, 2), "peak_kb": peak // 1024, "result": out}
+
+
+def run_size(n: int, blob_chars: int, legacy_max: int) -> list[dict]:
+    from .common import use_temp_sqlite
+
+    use_temp_sqlite(f"history-{n}.db")
+
+    from fastapi.testclient import TestClient
+
+    from backend.database import SessionLocal, Quiz
+    from backend.main import app
+
+    t = time.perf_counter()
+    _populate(n, blob_chars)
+    populate_s = time.perf_counter() - t
+    client = TestClient(app)
+
+    def legacy():
+        db = SessionLocal()
+        try:
+            rows = db.query(Quiz).order_by(Quiz.date_generated.desc()).all()
+            body = json.dumps([
+                {"id": r.id, "url": r.url, "title": r.title, "date_generated": r.date_generated}
+                for r in rows
+            ], default=str)
+            return len(rows), len(body)
+        finally:
+            db.close()
+
+    def get(params):
+        def call():
+            r = client.get("/history", params=params)
+            r.raise_for_status()
+            return len(r.json()), len(r.content)
+        return call
+
+    first = client.get("/history", params={"limit": 100})
+    # a cursor roughly in the middle of the table
+    deep_cursor = n // 2
+
+    cases = [
+        ("first_page_100", get({"limit": 100})),
+        ("deep_page_100", get({"limit": 100, "cursor": deep_cursor})),
+        ("streamed_page_5000", get({"limit": 5000, "cursor": first.headers.get("X-Next-Cursor")})),
+        ("url_prefix_100", get({"limit": 100, "url_prefix": "https://en.wikipedia.org/wiki/Crticle_"})),
+    ]
+    if n <= legacy_max:
+        cases.insert(0, ("legacy_all_rows", legacy))
+
+    results = []
+    for name, fn in cases:
+        fn()  # warm up
+        m = _measure(fn)
+        rows, body_bytes = m.pop("result")
+        results.append({"rows_in_table": n, "case": name, "rows_returned": rows,
+                        "body_bytes": body_bytes, **m, "populate_s": round(populate_s, 1)})
+    return results
+
+
+def main(args):
+    results = []
+    for n in args.sizes:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_history", "--run-one", str(n),
+             "--blob-chars", str(args.blob_chars), "--legacy-max", str(args.legacy_max)],
+            check=True, capture_output=True, text=True,
+        )
+        for row in json.loads(out.stdout):
+            print(json.dumps(row))
+            results.append(row)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--blob-chars", type=int, default=2000, help="quiz summary size per row")
+    parser.add_argument("--legacy-max", type=int, default=100000,
+                        help="skip the load-everything query above this many rows")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--run-one", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run_one:
+        print(json.dumps(run_size(args.run_one, args.blob_chars, args.legacy_max)))
+    else:
+        main(args)
@@ -0,0 +1,141 @@
+# benchmarks/common.py
+"""Shared helpers for the offline benchmarks: a stub article server and the fake LLM provider."""
+import os
+import re
+import hashlib
+import time
+import resource
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def use_temp_sqlite(name: str = "bench.db") -> str:
+    """Point DATABASE_URL at a fresh SQLite file. Call before importing backend modules."""
+    tmp = tempfile.mkdtemp(prefix="quizbench-")
+    path = os.path.join(tmp, name)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("QUIZ_HTML_CACHE_DIR", os.path.join(tmp, "html"))
+    os.environ.setdefault("QUIZ_LLM_PROVIDER", "fake")
+    return path
+
+
+def synthetic_article_html(title: str, paragraphs: int = 40, marker: str = "") -> str:
+    """A page shaped like a Wikipedia article (content div, infobox, refs, toc)."""
+    body = []
+    for i in range(paragraphs):
+        body.append(
+            f"<p>{title} paragraph {i} {marker} describes <a href='/wiki/X'>linked topics</a> "
+            f"with a citation<sup class='reference'><a href='#cite-{i}'>[{i}]</a></sup> and more "
+            f"prose about the history, geography and culture of the subject.</p>"
+        )
+        if i % 8 == 0:
+            body.append(f"<h2><span class='mw-headline'>Section {i // 8}</span></h2>")
+            body.append("<table class='infobox'><tr><td>Key</td><td>Value</td></tr></table>")
+    return (
+        "<html><head><title>{t}</title><style>.x{{}}</style></head><body>"
+        "<h1 id='firstHeading'>{t}</h1>"
+        "<div id='mw-content-text'><div class='toc'>Contents</div>{b}"
+        "<script>var x=1;</script></div></body></html>"
+    ).format(t=title, b="".join(body))
+
+
+_CONTENT_DIV_RE = re.compile(r'(<div[^>]*\bid="mw-content-text"[^>]*>)')
+
+
+def _page_variant(html: str, marker: str) -> str:
+    """A fixture page with one extra paragraph, so each URL has its own text (and content hash)."""
+    return _CONTENT_DIV_RE.sub(lambda m: f"{m.group(1)}<p>Variant {marker}.</p>", html, count=1)
+
+
+class StubArticleServer:
+    """
+    Threaded local HTTP server returning an article after `latency` seconds: a
+    synthetic one, or one of `pages` (fixture HTML, picked by path) when given.
+    Responses carry an ETag and a matching If-None-Match gets a 304.
+    """
+
+    def __init__(self, latency: float = 0.05, paragraphs: int = 40, pages: list[str] | None = None):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(server.latency)
+                # vary the text per path so the content-hash cache does not short-circuit
+                if server.pages:
+                    n = int(hashlib.md5(self.path.encode()).hexdigest(), 16) % len(server.pages)
+                    payload = _page_variant(server.pages[n], self.path).encode()
+                else:
+                    payload = synthetic_article_html("Stub Article", server.paragraphs, marker=self.path).encode()
+                etag = '"%s"' % hashlib.md5(payload).hexdigest()
+                server.requests += 1
+                if self.headers.get("If-None-Match") == etag:
+                    server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.latency = latency
+        self.paragraphs = paragraphs
+        self.pages = pages
+        self.requests = 0
+        self.not_modified = 0
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.request_queue_size = 1024
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def use_fake_llm(latency: float = 0.5, per_question: float = 0.0):
+    """
+    Route all LLM calls to the offline fake provider with a fixed latency and no
+    rate/concurrency limits, so benchmarks measure the app rather than the quota policy.
+    """
+    from backend.llm_providers import FakeProvider, set_provider
+    from backend.llm_quiz_generator import MODEL_ID
+
+    return set_provider(FakeProvider(MODEL_ID, latency=latency, per_question=per_question), concurrency=0)
+
+
+def peak_rss_kb() -> int:
+    """This process's peak RSS so far (kB)."""
+    # VmHWM is reset by exec; ru_maxrss inherits the parent's high-water mark on Linux
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
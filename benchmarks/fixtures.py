@@ -0,0 +1,143 @@
+# benchmarks/fixtures.py
+"""
+Wikipedia HTML fixtures for the offline benchmarks.
+
+Saved pages live in benchmarks/fixtures/*.html. To (re)capture real articles:
+
+    python -m benchmarks.fixtures https://en.wikipedia.org/wiki/Python_(programming_language) ...
+
+When the directory is empty, load_fixtures() falls back to deterministic synthetic
+pages that reproduce the markup the extractors care about (content div, infobox and
+navbox tables, references, toc, thumbs, hatnotes, comments, entities).
+"""
+import os
+import re
+import random
+import argparse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# name -> paragraphs; large is roughly a featured article
+SYNTHETIC_SIZES = {"small": 25, "medium": 120, "large": 600}
+
+_WORDS = (
+    "history river empire language temperature population culture trade city "
+    "dynasty orbit protein theorem election climate railway museum species "
+    "century treaty mountain island painting harbour composer reform economy"
+).split()
+
+
+def _sentence(rng: random.Random, n: int) -> str:
+    words = [rng.choice(_WORDS) for _ in range(n)]
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng: random.Random, i: int) -> str:
+    parts = []
+    for j in range(rng.randint(2, 5)):
+        s = _sentence(rng, rng.randint(8, 22))
+        if j == 0 and i == 0:
+            s = f"<b>Synthetic topic</b> ({rng.choice(_WORDS)}&nbsp;{rng.randint(1000, 2000)}) is {s}"
+        elif rng.random() < 0.5:
+            w = rng.choice(_WORDS)
+            s = s.replace(w, f'<a href="/wiki/{w.title()}" title="{w.title()}">{w}</a>', 1)
+        if rng.random() < 0.2:
+            s += ' <span class="mw-selflink selflink">Synthetic topic</span>'
+        parts.append(s)
+        if rng.random() < 0.6:
+            n = rng.randint(1, 300)
+            parts.append(
+                f'<sup id="cite_ref-{n}" class="reference"><a href="#cite_note-{n}">&#91;{n}&#93;</a></sup>'
+            )
+    if rng.random() < 0.1:
+        parts.append('<span class="nowrap">12&nbsp;km<sup>2</sup></span>')
+    return "<p>" + "\n".join(parts) + "\n</p>\n"
+
+
+def synthetic_wikipedia_html(title: str, paragraphs: int, seed: int = 0) -> str:
+    """Deterministic page with the structure of a rendered Wikipedia article."""
+    rng = random.Random(seed)
+    body = [
+        '<div class="shortdescription nomobile noexcerpt noprint searchaux" style="display:none">'
+        "Synthetic article</div>",
+        '<div role="note" class="hatnote navigation-not-searchable">For other uses, see '
+        '<a href="/wiki/Other">Other</a>.</div>',
+        '<style data-mw-deduplicate="TemplateStyles:r1">.mw-parser-output .infobox{border:1px}</style>',
+        '<table class="infobox vcard"><tbody><tr><th colspan="2">' + title + "</th></tr>"
+        + "".join(f"<tr><th>{w}</th><td>{rng.randint(1, 9999)}</td></tr>" for w in _WORDS[:12])
+        + "</tbody></table>",
+        "<p class=\"mw-empty-elt\">\n</p>\n",
+    ]
+    for i in range(paragraphs):
+        if i and i % 6 == 0:
+            sec = rng.choice(_WORDS).title()
+            body.append(f'<div class="mw-heading mw-heading2"><h2 id="{sec}_{i}">{sec}</h2>'
+                        f'<span class="mw-editsection">[<a href="#">edit</a>]</span></div>\n')
+        if i == 3:
+            body.append('<div id="toc" class="toc" role="navigation"><div class="toctitle"><h2>Contents</h2></div>'
+                        "<ul>" + "".join(f"<li>{w}</li>" for w in _WORDS[:8]) + "</ul></div>")
+        if i % 9 == 4:
+            body.append('<div class="thumb tright"><div class="thumbinner"><img src="x.jpg" alt="">'
+                        f'<div class="thumbcaption"><p>Caption {i} {_sentence(rng, 6)}</p></div></div></div>')
+        if i % 11 == 7:
+            body.append("<ul>" + "".join(f"<li>{_sentence(rng, 5)}</li>" for _ in range(4)) + "</ul>")
+        if i % 17 == 5:
+            body.append("<!-- editor note: " + _sentence(rng, 4) + " -->")
+        body.append(_paragraph(rng, i))
+    body.append('<div class="reflist"><ol class="references">'
+                + "".join(f'<li id="cite_note-{n}"><span class="reference-text">Ref {n}.</span></li>' for n in range(80))
+                + "</ol></div>")
+    body.append('<div role="navigation" class="navbox"><table class="nowraplinks"><tr><td>'
+                + " · ".join(_WORDS) + "</td></tr></table></div>")
+
+    return (
+        '<!DOCTYPE html>\n<html class="client-nojs" lang="en" dir="ltr"><head><meta charset="UTF-8">'
+        f"<title>{title} - Wikipedia</title>"
+        f'<link rel="canonical" href="https://en.wikipedia.org/wiki/{title.replace(" ", "_")}">'
+        "<script>document.documentElement.className='client-js';</script></head><body>"
+        '<div id="mw-navigation"><p>Navigation menu</p></div>'
+        f'<main id="content"><header><h1 id="firstHeading" class="firstHeading mw-first-heading">'
+        f'<span class="mw-page-title-main">{title}</span></h1></header>'
+        '<div id="bodyContent"><div id="mw-content-text" class="mw-body-content">'
+        '<div class="mw-content-ltr mw-parser-output" lang="en" dir="ltr">'
+        + "".join(body)
+        + "</div><!-- NewPP limit report --></div></div></main>"
+        '<footer id="footer"><p>Text is available under the CC BY-SA license.</p></footer>'
+        "</body></html>"
+    )
+
+
+def load_fixtures() -> list[tuple[str, str]]:
+    """[(name, html)] from benchmarks/fixtures/*.html, or synthetic pages when none are saved."""
+    if os.path.isdir(FIXTURE_DIR):
+        names = sorted(n for n in os.listdir(FIXTURE_DIR) if n.endswith(".html"))
+        if names:
+            out = []
+            for n in names:
+                with open(os.path.join(FIXTURE_DIR, n), encoding="utf-8") as f:
+                    out.append((n[:-len(".html")], f.read()))
+            return out
+    return [
+        (f"synthetic-{name}", synthetic_wikipedia_html(f"Synthetic {name}", n, seed=i))
+        for i, (name, n) in enumerate(SYNTHETIC_SIZES.items())
+    ]
+
+
+def save_fixture(url: str) -> str:
+    from backend.fetcher import session
+
+    resp = session.get(url, timeout=30)
+    resp.raise_for_status()
+    name = re.sub(r"[^A-Za-z0-9_.-]+", "_", url.rstrip("/").rsplit("/", 1)[-1]) or "index"
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    path = os.path.join(FIXTURE_DIR, f"{name}.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(resp.text)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Save Wikipedia pages as benchmark fixtures.")
+    parser.add_argument("urls", nargs="+")
+    for u in parser.parse_args().urls:
+        print("saved", save_fixture(u))
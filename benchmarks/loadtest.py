@@ -0,0 +1,385 @@
+# benchmarks/loadtest.py
+"""
+Load test for the full request path (generate / cached generate / batch / quiz by id
+/ history) against the FastAPI app, fully offline:
+
+    python -m benchmarks.loadtest                           # run, compare with benchmarks/baseline.json
+    python -m benchmarks.loadtest --scenarios history quiz_by_id --output results.json
+    python -m benchmarks.loadtest --save-baseline           # accept current numbers as the baseline
+
+Articles are the benchmark fixtures (see fixtures.py) served by a local stub server,
+one distinct variant per URL; the LLM is the fake provider with --llm-latency.
+Requests go through httpx's ASGI transport with --concurrency closed-loop clients,
+on a fresh SQLite database seeded with --seed-rows quizzes.
+
+Each scenario runs in its own process and reports p50/p95/p99 latency, throughput,
+peak RSS and a per-stage cost breakdown: the app's own stage timings (scrape, parse,
+cache_lookup, generate, persist, serialize; the names Server-Timing and /metrics use),
+plus FastAPI's response rendering, counted as serialize.
+
+Results are JSON. Against a baseline, a metric regresses when it is worse by more
+than --tolerance (relative; twice that for stage means) and by more than a small
+absolute noise floor, and a scenario regresses when it has more failed (4xx/5xx)
+requests than the baseline, or any without one. Exit status: 0 ok, 1 regression,
+3 baseline recorded with different settings (nothing compared). Baselines are
+machine-specific: regenerate on the machine that runs the comparison.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import itertools
+import subprocess
+from collections import defaultdict
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# name -> (requests, concurrency) defaults
+SCENARIOS = {
+    "generate_cold": (200, 50),      # every request scrapes, waits on the LLM and commits
+    "generate_cached": (2000, 50),   # repeat URLs: in-process cache hits
+    "batch": (10, 2),                # POST /generate_quiz/batch with BATCH_URLS articles each
+    "quiz_by_id": (2000, 50),
+    "history": (1000, 50),           # first pages and cursor pages of 100 rows
+}
+BATCH_URLS = 20
+HOT_URLS = 20
+WARMUP_REQUESTS = HOT_URLS  # also warms every generate_cached URL (indexes wrap around HOT_URLS)
+
+# metric -> (direction, absolute noise floor); latency in ms, memory in MB
+COMPARED_METRICS = {
+    "p50_ms": ("lower", 2.0),
+    "p95_ms": ("lower", 5.0),
+    "p99_ms": ("lower", 10.0),
+    "throughput_rps": ("higher", 2.0),
+    "peak_rss_mb": ("lower", 10.0),
+}
+# stage means include time spent waiting on the GIL / thread pool under load, so
+# they get twice the relative tolerance
+STAGE_NOISE_MS = 2.0
+
+EXIT_REGRESSION = 1
+EXIT_BASELINE_MISMATCH = 3
+
+
+# ---------- stage timing (child process) ---------- #
+class StageTimer:
+    """Collects wall time per stage from the app's own stage timings (backend.metrics)."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def observe(self, stage: str, seconds: float):
+        self.samples[stage].append(seconds)
+
+    def reset(self):
+        self.samples.clear()
+
+    def summary(self) -> dict:
+        from .common import percentile
+
+        return {
+            stage: {
+                "count": len(v),
+                "total_s": round(sum(v), 3),
+                "mean_ms": round(sum(v) / len(v) * 1000, 3),
+                "p95_ms": round(percentile(v, 95) * 1000, 3),
+            }
+            for stage, v in sorted(self.samples.items()) if v
+        }
+
+
+def _timed_async(stage: str, fn):
+    from backend.metrics import timed
+
+    async def wrapper(*args, **kwargs):
+        with timed(stage):
+            return await fn(*args, **kwargs)
+    return wrapper
+
+
+def _timed_sync(stage: str, fn):
+    from backend.metrics import timed
+
+    def wrapper(*args, **kwargs):
+        with timed(stage):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def _instrument(timer: StageTimer):
+    """
+    Report the stages the app times itself (the names in Server-Timing and /metrics).
+    Only FastAPI's response rendering is outside app code; it is timed here, under the
+    "serialize" stage /quiz/{id} records for its pre-serialized body.
+    """
+    import fastapi.routing
+    from starlette.responses import JSONResponse
+
+    from backend import metrics
+
+    metrics.add_stage_observer(timer.observe)
+    fastapi.routing.serialize_response = _timed_async("serialize", fastapi.routing.serialize_response)
+    JSONResponse.render = _timed_sync("serialize", JSONResponse.render)
+
+
+def _seed(rows: int):
+    from datetime import datetime, timedelta, timezone
+
+    from backend.blobs import add_quizzes
+    from backend.database import SessionLocal
+    from backend.llm_providers import canned_response
+
+    quiz_json = json.loads(canned_response("Article Content:\n" + "A seeded sentence about the subject of the quiz. " * 40))
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    db = SessionLocal()
+    try:
+        for offset in range(0, rows, 1000):
+            add_quizzes(db, [
+                ({"url": f"https://en.wikipedia.org/wiki/Seed_{i}", "title": f"Seed {i}",
+                  "date_generated": start + timedelta(minutes=i)}, None, quiz_json)
+                for i in range(offset, min(rows, offset + 1000))
+            ])
+            db.commit()
+    finally:
+        db.close()
+
+
+async def _drive(client, request, total: int, concurrency: int) -> tuple[list, int]:
+    """Closed loop: `concurrency` clients issue request(client, i) until `total` are done."""
+    latencies, errors = [], 0
+    counter = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while (i := next(counter)) < total:
+            start = time.perf_counter()
+            resp = await request(client, i)
+            latencies.append(time.perf_counter() - start)
+            if resp.status_code >= 400:
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def _request_factory(scenario: str, base_url: str, seed_rows: int):
+    rng = random.Random(0)
+
+    if scenario == "generate_cold":
+        async def request(client, i):
+            return await client.post("/generate_quiz", json={"url": f"{base_url}/wiki/Cold_{i}"})
+    elif scenario == "generate_cached":
+        async def request(client, i):
+            return await client.post("/generate_quiz", json={"url": f"{base_url}/wiki/Hot_{i % HOT_URLS}"})
+    elif scenario == "batch":
+        async def request(client, i):
+            urls = [f"{base_url}/wiki/Batch_{i}_{j}" for j in range(BATCH_URLS)]
+            return await client.post("/generate_quiz/batch", json={"urls": urls})
+    elif scenario == "quiz_by_id":
+        async def request(client, i):
+            return await client.get(f"/quiz/{rng.randint(1, seed_rows)}")
+    elif scenario == "history":
+        async def request(client, i):
+            params = {"limit": 100}
+            if i % 2:
+                params["cursor"] = rng.randint(100, seed_rows)
+            return await client.get("/history", params=params)
+    else:
+        raise ValueError(f"unknown scenario {scenario!r}")
+    return request
+
+
+def run_scenario(args) -> dict:
+    """Child process: set up a fresh app, run one scenario, return its result row."""
+    from .common import use_temp_sqlite, use_fake_llm, StubArticleServer, percentile, peak_rss_kb
+
+    use_temp_sqlite(f"loadtest-{args.run_one}.db")
+    os.environ["QUIZ_METRICS"] = "1"  # stage timings come from backend.metrics
+    os.environ["QUIZ_HTML_CACHE_DIR"] = ""  # every cold request really fetches
+    if args.async_pipeline:
+        os.environ["QUIZ_ASYNC_PIPELINE"] = "1"
+
+    import httpx
+
+    from backend.main import app
+    from .fixtures import load_fixtures
+
+    use_fake_llm(latency=args.llm_latency)
+    _seed(args.seed_rows)
+    timer = StageTimer()
+    _instrument(timer)
+
+    total, concurrency = SCENARIOS[args.run_one]
+    total = args.requests or total
+    concurrency = args.concurrency or concurrency
+    pages = [html for _, html in load_fixtures()]
+
+    async def go():
+        transport = httpx.ASGITransport(app=app)
+        with StubArticleServer(latency=args.scrape_latency, pages=pages) as stub:
+            request = _request_factory(args.run_one, stub.base_url, args.seed_rows)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+                async with app.router.lifespan_context(app):
+                    # warm up on indexes past the measured run's, so cold and batch requests
+                    # measured later are not cache hits on warmup articles
+                    async def warmup(client, i):
+                        return await request(client, total + i)
+
+                    await _drive(client, warmup, min(WARMUP_REQUESTS, total), min(concurrency, WARMUP_REQUESTS))
+                    timer.reset()
+                    rss_before = peak_rss_kb()
+                    start = time.perf_counter()
+                    latencies, errors = await _drive(client, request, total, concurrency)
+                    return latencies, errors, time.perf_counter() - start, rss_before
+
+    latencies, errors, wall, rss_before = asyncio.run(go())
+    peak = peak_rss_kb()
+    return {
+        "scenario": args.run_one,
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(total / wall, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "peak_rss_mb": round(peak / 1024, 1),
+        "rss_growth_mb": round((peak - rss_before) / 1024, 1),
+        "stages": timer.summary(),
+    }
+
+
+# ---------- parent: run, compare ---------- #
+def error_regressions(results: dict, baseline: dict | None) -> list[str]:
+    """Scenarios with more failed requests than the baseline (or any, without one)."""
+    regressions = []
+    for name, row in results["scenarios"].items():
+        allowed = ((baseline or {}).get("scenarios", {}).get(name) or {}).get("errors", 0)
+        if row["errors"] > allowed:
+            regressions.append(f"{name}.errors: {allowed} -> {row['errors']} of {row['requests']}")
+    return regressions
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Human-readable regressions of results against baseline (same scenario names only).
+    Failed requests are fast, so errors are checked first: latency alone would improve.
+    """
+    regressions = error_regressions(results, baseline)
+    for name, row in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        for metric, (direction, floor) in COMPARED_METRICS.items():
+            new, old = row.get(metric), base.get(metric)
+            if new is None or old is None:
+                continue
+            worse = new - old if direction == "lower" else old - new
+            if worse > floor and worse > tolerance * old:
+                regressions.append(f"{name}.{metric}: {old} -> {new}")
+        for stage, stats in row.get("stages", {}).items():
+            old = base.get("stages", {}).get(stage, {}).get("mean_ms")
+            if old is None:
+                continue
+            worse = stats["mean_ms"] - old
+            if worse > STAGE_NOISE_MS and worse > 2 * tolerance * old:
+                regressions.append(f"{name}.stages.{stage}.mean_ms: {old} -> {stats['mean_ms']}")
+    return regressions
+
+
+def _child_argv(args, scenario: str) -> list[str]:
+    argv = [sys.executable, "-m", "benchmarks.loadtest", "--run-one", scenario,
+            "--llm-latency", str(args.llm_latency), "--scrape-latency", str(args.scrape_latency),
+            "--seed-rows", str(args.seed_rows)]
+    if args.requests:
+        argv += ["--requests", str(args.requests)]
+    if args.concurrency:
+        argv += ["--concurrency", str(args.concurrency)]
+    if args.async_pipeline:
+        argv.append("--async-pipeline")
+    return argv
+
+
+def main(args) -> int:
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "llm_latency_s": args.llm_latency,
+            "scrape_latency_s": args.scrape_latency,
+            "seed_rows": args.seed_rows,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "async_pipeline": args.async_pipeline,
+        },
+        "scenarios": {},
+    }
+    for scenario in args.scenarios:
+        out = subprocess.run(_child_argv(args, scenario), check=True, capture_output=True, text=True)
+        row = json.loads(out.stdout.strip().splitlines()[-1])
+        results["scenarios"][scenario] = row
+        print(json.dumps(row), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        regressions = error_regressions(results, None)
+        results["regressions"] = regressions
+        print(json.dumps(results, indent=2))
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return EXIT_REGRESSION if regressions else 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    differing = sorted(
+        k for k in set(baseline.get("meta", {})) | set(results["meta"])
+        if baseline.get("meta", {}).get(k) != results["meta"].get(k)
+    )
+    if differing:
+        # numbers from other settings are not comparable; don't report spurious regressions
+        print(json.dumps(results, indent=2))
+        for k in differing:
+            print(f"baseline {k}={baseline.get('meta', {}).get(k)!r}, this run {results['meta'].get(k)!r}", file=sys.stderr)
+        print("baseline was recorded with different settings; nothing compared "
+              "(re-run with the baseline's settings, or --save-baseline)", file=sys.stderr)
+        return EXIT_BASELINE_MISMATCH
+    regressions = compare(results, baseline, args.tolerance)
+    results["regressions"] = regressions
+    print(json.dumps(results, indent=2))
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    return EXIT_REGRESSION if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, help="requests per scenario (default: per-scenario)")
+    parser.add_argument("--concurrency", type=int, help="concurrent clients (default: per-scenario)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="fake LLM delay per call (s)")
+    parser.add_argument("--scrape-latency", type=float, default=0.05, help="stub server delay per page (s)")
+    parser.add_argument("--seed-rows", type=int, default=5000, help="quizzes in the database before the run")
+    parser.add_argument("--async-pipeline", action="store_true", help="run with QUIZ_ASYNC_PIPELINE=1")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="write results to --baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown before failing")
+    parser.add_argument("--run-one", choices=list(SCENARIOS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run_one:
+        print(json.dumps(run_scenario(args)))
+    else:
+        sys.exit(main(args))
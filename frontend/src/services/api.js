@@ -13,10 +13,25 @@ export async function generateQuiz(url) {
   return res.json()
 }
 
-export async function getHistory() {
-  const res = await fetch(`${BASE}/history`)
+// One page of /history, newest first; pass nextCursor back to get the following page
+export async function getHistoryPage({ cursor = null, limit = 100 } = {}) {
+  const params = new URLSearchParams({ limit })
+  if (cursor != null) params.set('cursor', cursor)
+  const res = await fetch(`${BASE}/history?${params}`)
   if (!res.ok) throw new Error(res.statusText)
-  return res.json()
+  return { items: await res.json(), nextCursor: res.headers.get('X-Next-Cursor') }
+}
+
+// The whole history: /history is paginated, so follow X-Next-Cursor to the last page
+export async function getHistory() {
+  const all = []
+  let cursor = null
+  do {
+    const page = await getHistoryPage({ cursor, limit: 500 })
+    all.push(...page.items)
+    cursor = page.nextCursor
+  } while (cursor != null)
+  return all
 }
 
 export async function getQuiz(id) {
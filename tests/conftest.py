@@ -0,0 +1,5 @@
+# tests/conftest.py
+# backend modules read DATABASE_URL at import: give the test session its own SQLite file
+from benchmarks.common import use_temp_sqlite
+
+use_temp_sqlite("tests.db")
@@ -0,0 +1,86 @@
+# tests/test_cache.py
+"""Cache keys: equivalent article links share one key, different content never does."""
+from collections import OrderedDict
+
+import pytest
+
+from backend import cache
+from backend.cache import canonical_url, remember_redirect
+from backend.scraper import _resolved_url, _pin_revision
+
+ARTICLE = "https://en.wikipedia.org/wiki/Python_(programming_language)"
+
+
+@pytest.fixture(autouse=True)
+def no_learned_redirects(monkeypatch):
+    monkeypatch.setattr(cache, "_redirect_aliases", OrderedDict())
+
+
+@pytest.mark.parametrize("url", [
+    ARTICLE,
+    "https://en.m.wikipedia.org/wiki/Python_(programming_language)",
+    "http://en.wikipedia.org/wiki/Python_(programming_language)#History",
+    "https://en.wikipedia.org/wiki/python_(programming_language)",
+    "https://en.wikipedia.org/wiki/Python_%28programming_language%29",
+    "https://en.wikipedia.org/wiki/Python (programming language)",
+    "https://en.wikipedia.org/w/index.php?title=Python_(programming_language)",
+    "https://en.wikipedia.org/wiki/Python_(programming_language)?action=view&utm_source=x",
+    "  https://EN.wikipedia.org/wiki/Python_(programming_language)  ",
+])
+def test_equivalent_links_share_a_key(url):
+    assert canonical_url(url) == ARTICLE
+
+
+def test_revision_is_part_of_the_key():
+    assert canonical_url(ARTICLE + "?oldid=123") == ARTICLE + "?oldid=123"
+    assert canonical_url(ARTICLE + "?oldid=123&diff=prev") == ARTICLE + "?oldid=123"
+    assert canonical_url(
+        "https://en.wikipedia.org/w/index.php?title=Python_(programming_language)&oldid=123"
+    ) == ARTICLE + "?oldid=123"
+    assert canonical_url(ARTICLE + "?oldid=123") != canonical_url(ARTICLE + "?oldid=124")
+
+
+def test_only_the_first_letter_is_case_insensitive():
+    assert canonical_url("https://en.wikipedia.org/wiki/iPhone") == "https://en.wikipedia.org/wiki/IPhone"
+    assert canonical_url("https://en.wikipedia.org/wiki/Python_(Programming_language)") != ARTICLE
+
+
+def test_other_sites_keep_their_query():
+    assert canonical_url("https://Example.com/page?id=7#top") == "https://example.com/page?id=7"
+
+
+def test_learned_redirect():
+    usa = canonical_url("https://en.wikipedia.org/wiki/USA")
+    remember_redirect(usa, "https://en.wikipedia.org/wiki/United_States")
+    assert canonical_url("https://en.m.wikipedia.org/wiki/USA") == "https://en.wikipedia.org/wiki/United_States"
+
+
+def test_redirect_aliases_are_bounded(monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_MAX_ENTRIES", 2)
+    for i in range(20):
+        remember_redirect(f"https://en.wikipedia.org/wiki/A{i}", f"https://en.wikipedia.org/wiki/B{i}")
+    assert len(cache._redirect_aliases) == 8
+    assert "https://en.wikipedia.org/wiki/A19" in cache._redirect_aliases
+
+
+# ---------- resolved URL of a scraped page ---------- #
+def _page(canonical: str) -> str:
+    return f'<html><head><link rel="canonical" href="{canonical}"></head><body></body></html>'
+
+
+def test_canonical_link_on_the_same_site_is_followed():
+    html = _page("https://en.wikipedia.org/wiki/United_States")
+    assert _resolved_url("https://en.m.wikipedia.org/wiki/USA", html) == "https://en.wikipedia.org/wiki/United_States"
+
+
+def test_canonical_link_to_another_site_is_ignored():
+    # a page must not be able to claim another site's cache key
+    html = _page(ARTICLE)
+    assert _resolved_url("https://attacker.example/wiki/Python", html) == "https://attacker.example/wiki/Python"
+    assert _resolved_url("https://wikipedia.org.attacker.example/x", html) == "https://wikipedia.org.attacker.example/x"
+
+
+def test_requested_revision_survives_resolution():
+    assert _pin_revision(ARTICLE + "?oldid=5", ARTICLE) == ARTICLE + "?oldid=5"
+    assert _pin_revision(ARTICLE, ARTICLE) == ARTICLE
+    assert _pin_revision(ARTICLE + "?oldid=5", ARTICLE + "?oldid=6") == ARTICLE + "?oldid=6"
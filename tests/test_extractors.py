@@ -0,0 +1,53 @@
+# tests/test_extractors.py
+"""
+The lxml extractor must return exactly what the BeautifulSoup reference does.
+
+Runs on every page in benchmarks/fixtures/ (capture real articles with
+`python -m benchmarks.fixtures URL ...`; synthetic pages when none are saved) and
+on small markup edge cases where the two HTML parsers build different trees.
+"""
+import pytest
+
+from backend import extractors
+from backend.extractors import extract_bs4
+from benchmarks.fixtures import load_fixtures
+
+pytestmark = pytest.mark.skipif(extractors.etree is None, reason="lxml not installed")
+
+PAGE = (
+    '<html><body><h1 id="firstHeading">Title</h1>'
+    '<div id="mw-content-text"><div class="mw-parser-output">{}</div></div></body></html>'
+)
+
+EDGE_CASES = {
+    "block_inside_p": "<p>alpha <div>beta</div> gamma</p>",
+    "unclosed_p": "<p>one<p>two",
+    "table_inside_p": "<p>x<table><tr><td>t</td></tr></table>y</p>",
+    "list_inside_p": "<p>a <ul><li>b</li></ul> c</p><p>d</p>",
+    "p_closed_by_container": "<div><p>one</div><p>two</p>",
+    "uppercase_tags": "<P>Upper <B>case</B></P><p>lower</p>",
+    "removed_elements": '<p>keep<sup class="reference">[1]</sup> <span class="toc">drop</span>this</p>',
+    "selflink": '<p>See <a class="mw-selflink selflink">Title</a> here.</p>',
+    "entities_and_whitespace": "<p>  a&nbsp;b \n\n c &amp; d </p>",
+    "empty_paragraphs": '<p class="mw-empty-elt">\n</p><p>text</p>',
+    "no_paragraphs": "<div>only <span>div text</span></div>",
+}
+
+
+@pytest.mark.parametrize("html", [pytest.param(html, id=name) for name, html in load_fixtures()])
+@pytest.mark.parametrize("max_paragraphs", [None, 5])
+def test_fixture_pages_match_bs4(html, max_paragraphs):
+    assert extractors.extract_lxml(html, max_paragraphs) == extract_bs4(html, max_paragraphs)
+
+
+@pytest.mark.parametrize("body", EDGE_CASES.values(), ids=EDGE_CASES.keys())
+def test_edge_cases_match_bs4(body):
+    html = PAGE.format(body)
+    assert extractors.extract_lxml(html) == extract_bs4(html)
+
+
+def test_implicitly_closed_p_detection():
+    assert extractors._closes_p_implicitly("<p>a<div>b</div>c</p>")
+    assert extractors._closes_p_implicitly("<p>one<p>two")
+    assert not extractors._closes_p_implicitly("<p>a <pre-wrap>b</pre-wrap></p><pre>c</pre>")
+    assert not extractors._closes_p_implicitly("<div><p>a</p><table><tr><td>b</td></tr></table></div>")
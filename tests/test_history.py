@@ -0,0 +1,88 @@
+# tests/test_history.py
+"""/history keyset pagination: walking X-Next-Cursor visits every row once, newest first."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+
+from backend import main
+from backend.blobs import add_quizzes
+from backend.database import SessionLocal, Quiz, QuizPayload
+
+ROWS = 57
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _date(i: int) -> datetime:
+    # every third row shares its timestamp with the next, so ties are broken by id
+    return START + timedelta(minutes=i // 3 * 3)
+
+
+@pytest.fixture(scope="module")
+def client():
+    db = SessionLocal()
+    try:
+        db.execute(delete(QuizPayload))
+        db.execute(delete(Quiz))
+        add_quizzes(db, [
+            ({"url": f"https://en.wikipedia.org/wiki/{'Topic' if i % 2 else 'Other'}_{i}",
+              "title": f"{'Topic' if i % 2 else 'Other'} {i}", "date_generated": _date(i)},
+             None, {"summary": "", "questions": []})
+            for i in range(ROWS)
+        ])
+        db.commit()
+    finally:
+        db.close()
+    return TestClient(main.app)  # no lifespan: job workers are not needed
+
+
+def _walk(client, **params) -> list[dict]:
+    rows, cursor = [], None
+    while True:
+        resp = client.get("/history", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert resp.status_code == 200
+        rows.extend(resp.json())
+        cursor = resp.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return rows
+
+
+def _expected(rows: list[dict]) -> list[dict]:
+    return sorted(rows, key=lambda r: (r["date_generated"], r["id"]), reverse=True)
+
+
+@pytest.mark.parametrize("limit", [1, 3, 10, ROWS, ROWS + 1])
+def test_pages_cover_every_row_once_newest_first(client, limit):
+    rows = _walk(client, limit=limit)
+    assert len(rows) == ROWS
+    assert len({r["id"] for r in rows}) == ROWS
+    assert rows == _expected(rows)
+
+
+def test_no_cursor_after_the_last_page(client):
+    resp = client.get("/history", params={"limit": ROWS})
+    assert len(resp.json()) == ROWS
+    assert "X-Next-Cursor" not in resp.headers
+
+
+def test_streamed_pages_match_built_pages(client, monkeypatch):
+    built = _walk(client, limit=20)
+    monkeypatch.setattr(main, "HISTORY_STREAM_THRESHOLD", 5)
+    streamed = _walk(client, limit=20)
+    assert streamed == built
+
+
+def test_prefix_filters(client):
+    rows = _walk(client, limit=7, title_prefix="Topic")
+    assert len(rows) == ROWS // 2
+    assert all(r["title"].startswith("Topic") for r in rows)
+    assert rows == _expected(rows)
+    # LIKE wildcards in the prefix are literal
+    assert _walk(client, url_prefix="https://en.wikipedia.org/wiki/Topic_1") != []
+    assert _walk(client, url_prefix="https://en.wikipedia.org/wiki/Topic%") == []
+    assert _walk(client, title_prefix="_opic") == []
+
+
+def test_unknown_cursor_is_rejected(client):
+    assert client.get("/history", params={"cursor": 10**9}).status_code == 400
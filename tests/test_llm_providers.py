@@ -0,0 +1,112 @@
+# tests/test_llm_providers.py
+"""Call-policy primitives shared by threads and event loops: rate buckets and the concurrency cap."""
+import time
+import asyncio
+import threading
+
+import pytest
+
+from backend.llm_providers import TokenBucket, ConcurrencyLimiter
+
+
+# ---------- TokenBucket ---------- #
+def test_bucket_burst_then_wait():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # empty: the third unit arrives after 1/rate seconds, the fourth after 2/rate
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_bucket_oversized_request_waits_for_a_full_bucket():
+    bucket = TokenBucket(rate=100, capacity=50)
+    assert bucket.reserve(50) == 0
+    assert bucket.reserve(1000) == pytest.approx(0.5, abs=0.01)
+
+
+def test_bucket_refund_returns_the_reservation():
+    bucket = TokenBucket(rate=1, capacity=2)
+    bucket.reserve(2)
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.01)
+    bucket.refund(1)
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.01)
+
+
+def test_bucket_disabled():
+    bucket = TokenBucket(rate=0, capacity=1)
+    assert all(bucket.reserve(1000) == 0 for _ in range(10))
+
+
+# ---------- ConcurrencyLimiter ---------- #
+async def _lost_wakeup_scenario(cancel_after_result: bool) -> ConcurrencyLimiter:
+    limiter = ConcurrencyLimiter(1)
+    await limiter.acquire_async()                         # holder
+    first = asyncio.create_task(limiter.acquire_async())  # picked by release(), then cancelled
+    second = asyncio.create_task(limiter.acquire_async())
+    await asyncio.sleep(0)
+    limiter.release()  # schedules the wake for `first`
+    if cancel_after_result:
+        await asyncio.sleep(0)  # the wake ran: first's future already has its result
+    first.cancel()
+    # the wakeup must pass on to `second`, not be lost with `first`
+    await asyncio.wait_for(second, 1.0)
+    return limiter
+
+
+@pytest.mark.parametrize("cancel_after_result", [False, True], ids=["cancel_before_wake", "cancel_after_result"])
+def test_cancelled_waiter_passes_its_wakeup_on(cancel_after_result):
+    limiter = asyncio.run(_lost_wakeup_scenario(cancel_after_result))
+    assert limiter.active == 1
+    assert not limiter._waiters
+
+
+def test_limiter_caps_holders_across_tasks():
+    limiter = ConcurrencyLimiter(3)
+    peak = active = 0
+
+    async def worker():
+        nonlocal peak, active
+        for _ in range(20):
+            await limiter.acquire_async()
+            active += 1
+            peak = max(peak, active)
+            try:
+                await asyncio.sleep(0)
+            finally:
+                active -= 1
+                limiter.release()
+
+    async def main():
+        workers = [asyncio.create_task(worker()) for _ in range(50)]
+        # cancel some while they wait; the rest must still drain
+        await asyncio.sleep(0)
+        for w in workers[::7]:
+            w.cancel()
+        await asyncio.wait_for(asyncio.gather(*workers, return_exceptions=True), 5.0)
+
+    asyncio.run(main())
+    assert peak == 3
+    assert limiter.active == 0
+
+
+def test_limiter_wakes_coroutines_on_thread_release():
+    limiter = ConcurrencyLimiter(1)
+    limiter.acquire()
+    threading.Timer(0.05, limiter.release).start()
+
+    async def main():
+        await asyncio.wait_for(limiter.acquire_async(), 1.0)
+
+    asyncio.run(main())
+    assert limiter.active == 1
+
+
+def test_limiter_acquire_timeout():
+    limiter = ConcurrencyLimiter(1)
+    assert limiter.acquire(timeout=0)
+    start = time.monotonic()
+    assert not limiter.acquire(timeout=0.05)
+    assert time.monotonic() - start >= 0.05
+    limiter.release()
+    assert limiter.acquire(timeout=0.05)
@@ -0,0 +1,66 @@
+# tests/test_singleflight.py
+import asyncio
+
+import pytest
+
+from backend.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    async def main():
+        return await asyncio.gather(*(flight.do("a", work) for _ in range(10)), flight.do("b", work))
+
+    results = asyncio.run(main())
+    assert calls == 2
+    assert len(set(results[:10])) == 1
+    assert flight.snapshot() == {"leaders": 2, "coalesced": 9, "inflight": 0}
+
+
+def test_exception_reaches_every_caller_and_is_not_cached():
+    flight = SingleFlight()
+    attempts = 0
+
+    async def failing():
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        results = await asyncio.gather(*(flight.do("k", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        # the key is free again: the next caller retries
+        with pytest.raises(ValueError):
+            await flight.do("k", failing)
+
+    asyncio.run(main())
+    assert attempts == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.create_task(flight.do("k", work))
+        second = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(main())
+    assert flight.snapshot()["inflight"] == 0